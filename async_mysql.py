@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+import itertools
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from .mysql import MySqlDBClass
+
+
+class AsyncMySqlDBClass(object):
+    """
+    mysql异步操作类
+        基于 MySqlDBClass 连接池模式 在有界线程池中执行 不阻塞事件循环
+        sql生成方法与 MySqlDBClass 共用
+    """
+
+    def __init__(self, host: str = '', port: int = 3306, user: str = '', password: str = '', db: str = '',
+                 max_workers: int = 10, db_class: typing.Optional[MySqlDBClass] = None, **kwargs) -> None:
+        """
+        :param max_workers: 最大并发数 (线程数及连接池最大连接数)
+        :param db_class: 已创建的 MySqlDBClass 实例 (测试时可传入使用模拟连接的实例) 指定时忽略连接参数
+        :param kwargs: 其他 MySqlDBClass 参数
+        """
+        if db_class is None:
+            kwargs.setdefault('pool_max', max_workers)
+            db_class = MySqlDBClass(host=host, port=port, user=user, password=password, db=db, **kwargs)
+        self.db = db_class
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async_mysql')
+
+    def get_insert(self, table: str, data_dict: typing.Dict, key_type_dict: typing.Dict) -> str:
+        """
+        get_insert 参数同 MySqlDBClass.get_insert
+        """
+        return self.db.get_insert(table=table, data_dict=data_dict, key_type_dict=key_type_dict)
+
+    def get_delete(self, table: str, condition: str) -> str:
+        """
+        get_delete 参数同 MySqlDBClass.get_delete
+        """
+        return self.db.get_delete(table=table, condition=condition)
+
+    def get_update(self, table: str, condition: str, update_dict: typing.Dict, update_key_dict: typing.Dict) -> str:
+        """
+        get_update 参数同 MySqlDBClass.get_update
+        """
+        return self.db.get_update(table=table, condition=condition, update_dict=update_dict,
+                                  update_key_dict=update_key_dict)
+
+    def get_select(self, **kwargs) -> str:
+        """
+        get_select 参数同 MySqlDBClass.get_select
+        """
+        return self.db.get_select(**kwargs)
+
+    async def insert(self, insert_dict: typing.Dict, **kwargs) -> typing.Any:
+        """
+        异步 insert 参数同 MySqlDBClass.insert
+        """
+        return await self._run(self.db.insert, insert_dict=insert_dict, **kwargs)
+
+    async def insert_many(self, table: str, rows: typing.Iterable[typing.Dict],
+                          key_type_dict: typing.Optional[typing.Dict] = None,
+                          **kwargs) -> typing.List[typing.List[int]]:
+        """
+        异步 insert_many 参数同 MySqlDBClass.insert_many
+        """
+        return await self._run(self.db.insert_many, table=table, rows=rows, key_type_dict=key_type_dict, **kwargs)
+
+    async def upsert(self, table: str, data_dict: typing.Dict, **kwargs) -> typing.Dict:
+        """
+        异步 upsert 参数同 MySqlDBClass.upsert
+        """
+        return await self._run(self.db.upsert, table=table, data_dict=data_dict, **kwargs)
+
+    async def upsert_many(self, table: str, rows: typing.Iterable[typing.Dict], **kwargs) -> typing.List[typing.Dict]:
+        """
+        异步 upsert_many 参数同 MySqlDBClass.upsert_many
+        """
+        return await self._run(self.db.upsert_many, table=table, rows=rows, **kwargs)
+
+    async def load_data(self, table: str, rows: typing.Iterable[typing.Any], **kwargs) -> typing.Dict:
+        """
+        异步 load_data 参数同 MySqlDBClass.load_data
+        """
+        return await self._run(self.db.load_data, table=table, rows=rows, **kwargs)
+
+    async def delete(self, delete_dict: typing.Dict, print_sql: bool = False) -> int:
+        """
+        异步 delete 参数同 MySqlDBClass.delete
+        """
+        return await self._run(self.db.delete, delete_dict=delete_dict, print_sql=print_sql)
+
+    async def update(self, update_dict: typing.Dict, print_sql: bool = False, check_exist: bool = True) -> int:
+        """
+        异步 update 参数同 MySqlDBClass.update
+        """
+        return await self._run(self.db.update, update_dict=update_dict, print_sql=print_sql, check_exist=check_exist)
+
+    async def update_many(self, table: str, rows: typing.Iterable[typing.Dict], **kwargs) -> typing.List[int]:
+        """
+        异步 update_many 参数同 MySqlDBClass.update_many
+        """
+        return await self._run(self.db.update_many, table=table, rows=rows, **kwargs)
+
+    async def select(self, select_dict: typing.Dict, print_sql: bool = False, row_type: str = 'dict') -> typing.List:
+        """
+        异步 select 参数同 MySqlDBClass.select
+        """
+        return await self._run(self.db.select, select_dict=select_dict, print_sql=print_sql, row_type=row_type)
+
+    async def select_yield(self, select_dict: typing.Dict, print_sql: bool = False, row_type: str = 'dict',
+                           **kwargs) -> typing.AsyncGenerator:
+        """
+        异步迭代查询 按 step 行为一批在线程池中读取
+        :param select_dict: 查询参数字典 同 MySqlDBClass.select_yield
+        :param print_sql: 是否打印sql语句
+        :param row_type: 行类型 dict / row (紧凑行 Row) 见 MySqlDBClass.select
+        :param kwargs: 其他 MySqlDBClass.select_yield 参数
+        :return:
+        """
+        _step = select_dict.get('step', 1000)
+        _generator = self.db.select_yield(select_dict=select_dict, print_sql=print_sql, row_type=row_type, **kwargs)
+        try:
+            while True:
+                _results = await self._run(self._take, generator=_generator, num=_step)
+                if not _results:
+                    break
+                for _result in _results:
+                    yield _result
+        finally:
+            await self._run(_generator.close)
+
+    async def select_incremental(self, select_dict: typing.Dict, checkpoint: typing.Any, row_type: str = 'dict',
+                                 **kwargs) -> typing.AsyncGenerator:
+        """
+        异步增量查询 按 step 行为一批在线程池中读取 参数同 MySqlDBClass.select_incremental
+        """
+        _step = select_dict.get('step', 1000)
+        _generator = self.db.select_incremental(select_dict=select_dict, checkpoint=checkpoint, row_type=row_type,
+                                                **kwargs)
+        try:
+            while True:
+                _results = await self._run(self._take, generator=_generator, num=_step)
+                if not _results:
+                    break
+                for _result in _results:
+                    yield _result
+        finally:
+            await self._run(_generator.close)
+
+    async def select_count(self, select_dict: typing.Dict, print_sql: bool = False, **kwargs) -> int:
+        """
+        异步 select_count 参数同 MySqlDBClass.select_count
+        """
+        return await self._run(self.db.select_count, select_dict=select_dict, print_sql=print_sql, **kwargs)
+
+    async def select_by_dict(self, table: str, data_dict: typing.Dict,
+                             key_type_dict: typing.Optional[typing.Dict] = None,
+                             print_sql: bool = False) -> typing.List:
+        """
+        异步 select_by_dict 参数同 MySqlDBClass.select_by_dict
+        """
+        return await self._run(self.db.select_by_dict, table=table, data_dict=data_dict,
+                               key_type_dict=key_type_dict, print_sql=print_sql)
+
+    async def select_by_dict_many(self, table: str, rows: typing.Iterable[typing.Dict],
+                                  **kwargs) -> typing.List[typing.List]:
+        """
+        异步 select_by_dict_many 参数同 MySqlDBClass.select_by_dict_many
+        """
+        return await self._run(self.db.select_by_dict_many, table=table, rows=rows, **kwargs)
+
+    async def export(self, select_dict: typing.Dict, path: str, **kwargs) -> typing.Dict:
+        """
+        异步 export 参数同 MySqlDBClass.export
+        """
+        return await self._run(self.db.export, select_dict=select_dict, path=path, **kwargs)
+
+    async def copy_table(self, target: MySqlDBClass, select_dict: typing.Dict, **kwargs) -> typing.Dict:
+        """
+        异步 copy_table 参数同 MySqlDBClass.copy_table (target 为 MySqlDBClass 实例)
+        """
+        return await self._run(self.db.copy_table, target=target, select_dict=select_dict, **kwargs)
+
+    async def select_table_info(self, name: str, schema: str = '') -> typing.List:
+        """
+        异步 select_table_info 参数同 MySqlDBClass.select_table_info
+        """
+        return await self._run(self.db.select_table_info, name=name, schema=schema)
+
+    async def desc_table(self, table: str, print_sql: bool = False) -> typing.List:
+        """
+        异步 desc_table 参数同 MySqlDBClass.desc_table
+        """
+        return await self._run(self.db.desc_table, table=table, print_sql=print_sql)
+
+    async def close(self) -> None:
+        """
+        释放连接池及线程池
+        :return:
+        """
+        await self._run(self.db.close)
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, func: typing.Callable, *args, **kwargs) -> typing.Any:
+        """
+        在线程池中执行同步方法
+        :param func: 同步方法
+        :return:
+        """
+        _loop = asyncio.get_running_loop()
+        return await _loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    @staticmethod
+    def _take(generator: typing.Iterator, num: int) -> typing.List:
+        """
+        从迭代器中读取最多num条
+        :param generator: 迭代器
+        :param num: 数量
+        :return:
+        """
+        return list(itertools.islice(generator, num))
+
+    async def __aenter__(self) -> 'AsyncMySqlDBClass':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
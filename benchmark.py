@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准
+    使用内存模拟连接 不连接数据库 测量本工具自身的开销 可设置每次往返延迟模拟网络 记录往返次数
+    用例:
+        row_mode: select (dict 行 / Row 紧凑行 / 旧版深复制清洗) 及 insert (当前 / 旧版深复制参数) 的每行耗时与内存
+        insert: insert / insert_many / upsert_many 每秒行数及往返次数 查重开销
+        select: 不同表大小及分页步长下 select / select_yield (偏移分页 / 定位分页) 每秒行数及往返次数
+        cache: 不同查询条件下 结果缓存条数 / 字节数 / 内存增长
+        builder: sql生成方法 (get_insert / get_insert_args / get_select / item_data_2_str) 单次耗时
+    结果为 JSON 便于记录及对比
+    运行: python -m my_db_utils.benchmark --latency 0.0002 --output result.json
+"""
+import argparse
+import copy
+import json
+import platform
+import re
+import sys
+import time
+import timeit
+import tracemalloc
+import typing
+
+import pymysql
+
+from .mysql import MySqlDBClass
+
+_LIMIT_RE = re.compile(r'LIMIT\s+(\d+)\s*,\s*(\d+)\s*$', flags=re.I)
+_SEEK_RE = re.compile(r'`id`\s*>\s*(-?\d+)')
+_CASE_LIST = ['row_mode', 'insert', 'select', 'cache', 'builder']
+_DESCRIPTION = (('id',), ('name',), ('score',), ('note',), ('created',))
+_KEY_TYPE_DICT = {'name': str, 'score': float, 'note': str, 'created': str}
+
+
+class FakeCursor(object):
+    """
+    模拟游标
+        SELECT COUNT 返回行数 SELECT @@max_allowed_packet 返回 4MB 带参数的 SELECT (查重) 返回空
+        其他 SELECT 按 `id` > x 及 LIMIT 返回预生成的行 (id 从1开始连续) 写入语句影响行数为 VALUES 行数
+    """
+
+    def __init__(self, conn: 'FakeConnection', cursorclass: typing.Any) -> None:
+        self.conn = conn
+        self.is_dict = issubclass(cursorclass, pymysql.cursors.DictCursorMixin)
+        self.description = None
+        self.rowcount = 0
+        self.lastrowid = 0
+        self._results = ()
+
+    def execute(self, query: str, args: typing.Optional[typing.Sequence] = None) -> int:
+        self.conn.round_trip()
+        self.conn.in_transaction = True  # 非自动提交 执行后隐式开启事务
+        _rows = ()
+        if query.lstrip()[:6].upper() == 'SELECT':
+            if '@@max_allowed_packet' in query:
+                self.description = (('max_allowed_packet',),)
+                _rows = ((4 * 1024 * 1024,),)
+            elif 'COUNT(' in query.upper():
+                self.description = (('count',),)
+                _rows = ((len(self.conn.rows),),)
+            elif args is None:
+                self.description = self.conn.description
+                _seek = _SEEK_RE.search(query)
+                _offset = max(int(_seek.group(1)), 0) if _seek else 0
+                _match = _LIMIT_RE.search(query)
+                _start, _step = (int(_match.group(1)), int(_match.group(2))) if _match else (0, len(self.conn.rows))
+                _rows = self.conn.rows[_offset + _start:_offset + _start + _step]
+            if self.is_dict:
+                _name_tuple = tuple(_d[0] for _d in self.description or ())
+                _rows = tuple(dict(zip(_name_tuple, _row)) for _row in _rows)
+            self.rowcount = len(_rows)
+        else:
+            self.rowcount = query.count('),(') + 1
+            self.conn.lastrowid += self.rowcount
+            self.lastrowid = self.conn.lastrowid - self.rowcount + 1
+        self._results = _rows
+        return self.rowcount
+
+    def fetchall(self) -> typing.Sequence:
+        return self._results
+
+    def fetchmany(self, size: int) -> typing.Sequence:
+        ret_results, self._results = self._results[:size], self._results[size:]
+        return ret_results
+
+    def mogrify(self, query: str, args: typing.Optional[typing.Sequence] = None) -> str:
+        return query
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection(object):
+    """
+    模拟连接 共用预生成的结果行 每次往返 (执行 / 提交 / 回滚) 等待 latency 秒
+        in_transaction 记录是否有未结束的隐式事务 (执行后开启 提交 / 回滚后结束)
+    """
+
+    def __init__(self, rows: typing.Sequence[typing.Tuple], description: typing.Sequence,
+                 cursorclass: typing.Any, latency: float = 0,
+                 count_dict: typing.Optional[typing.Dict] = None) -> None:
+        self.rows = rows
+        self.description = description
+        self.cursorclass = cursorclass
+        self.latency = latency
+        self.count_dict = count_dict if count_dict is not None else {'round_trip': 0}  # 往返次数 (可多个连接共用)
+        self.lastrowid = 0
+        self.open = True
+        self.in_transaction = False
+
+    def round_trip(self) -> None:
+        """
+        记录一次往返 模拟网络延迟
+        :return:
+        """
+        self.count_dict['round_trip'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cursor(self, cursor: typing.Any = None) -> FakeCursor:
+        return FakeCursor(conn=self, cursorclass=cursor or self.cursorclass)
+
+    def commit(self) -> None:
+        self.round_trip()
+        self.in_transaction = False
+
+    def rollback(self) -> None:
+        self.round_trip()
+        self.in_transaction = False
+
+    def ping(self, reconnect: bool = True) -> None:
+        pass
+
+    def close(self) -> None:
+        self.open = False
+
+
+class BenchDBClass(MySqlDBClass):
+    """
+    使用模拟连接的 MySqlDBClass
+    """
+
+    def __init__(self, rows: typing.Sequence[typing.Tuple], description: typing.Sequence = _DESCRIPTION,
+                 latency: float = 0, **kwargs) -> None:
+        self._fake_rows = rows
+        self._fake_description = description
+        self._fake_latency = latency
+        self.fake_count_dict = {'round_trip': 0}  # 所有模拟连接的往返次数
+        super().__init__(host='bench', port=0, user='', password='', db='bench', **kwargs)
+
+    def _new_conn(self, cursor_str: str = '', **kwargs) -> FakeConnection:
+        return FakeConnection(rows=self._fake_rows, description=self._fake_description,
+                              cursorclass=self.cursor_dict[cursor_str or self.cursor_str],
+                              latency=self._fake_latency, count_dict=self.fake_count_dict)
+
+
+class LegacyDBClass(BenchDBClass):
+    """
+    旧版行为对照 每行深复制清洗 插入参数深复制
+    """
+
+    @staticmethod
+    def _data_dict_cleaning(data_dict: typing.Dict) -> typing.Dict:
+        ret_data_dict = copy.deepcopy(data_dict)
+        for _key, _value in data_dict.items():
+            if _value is None:
+                ret_data_dict[_key] = ''
+        return ret_data_dict
+
+    def insert(self, insert_dict: typing.Dict, **kwargs) -> typing.Any:
+        return super().insert(insert_dict=copy.deepcopy(insert_dict), **kwargs)
+
+
+def make_rows(num: int) -> typing.List[typing.Tuple]:
+    """
+    生成模拟结果行 内容固定 (可复现) 部分字段为 NULL
+    :param num: 行数
+    :return: [(id, name, score, note, created)] id 从1开始连续
+    """
+    return [(_i + 1, f"name_{_i}", _i * 0.5, None if _i % 3 else f"note_{_i}", '2024-01-01 00:00:00')
+            for _i in range(num)]
+
+
+def make_data(num: int, prefix: str = 'name') -> typing.List[typing.Dict]:
+    """
+    生成模拟插入数据
+    :param num: 行数
+    :param prefix: name 字段前缀 各用例不同 避免命中插入结果缓存
+    :return:
+    """
+    return [{'name': f"{prefix}_{_i}", 'score': _i * 0.5, 'note': None, 'created': '2024-01-01 00:00:00'}
+            for _i in range(num)]
+
+
+def measure(func: typing.Callable[[], typing.Any], num: int, repeat: int = 3) -> typing.Dict:
+    """
+    测量耗时 (取最小值) 及内存分配峰值 (tracemalloc 单独一轮 不计入耗时)
+    :param func: 被测方法
+    :param num: 处理行数 用于计算每行值
+    :param repeat: 耗时测量次数
+    :return: {'seconds', 'us_per_row', 'peak_bytes', 'bytes_per_row'}
+    """
+    _seconds = float('inf')
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        func()
+        _seconds = min(_seconds, time.perf_counter() - _start)
+    tracemalloc.start()
+    try:
+        _result = func()  # 持有结果 峰值包含返回数据
+        _, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del _result
+    return {
+        'seconds': round(_seconds, 6),
+        'us_per_row': round(_seconds / num * 1e6, 3),
+        'peak_bytes': _peak,
+        'bytes_per_row': round(_peak / num, 1),
+    }
+
+
+def measure_trip(db: BenchDBClass, func: typing.Callable[[], typing.Any], num: int) -> typing.Dict:
+    """
+    测量单次执行耗时及往返次数 (含模拟延迟)
+    :param db: 模拟连接实例
+    :param func: 被测方法
+    :param num: 处理行数
+    :return: {'seconds', 'rows_per_second', 'round_trip'}
+    """
+    _trip = db.fake_count_dict['round_trip']
+    _start = time.perf_counter()
+    func()
+    _seconds = time.perf_counter() - _start
+    return {
+        'seconds': round(_seconds, 6),
+        'rows_per_second': round(num / _seconds, 1) if _seconds else 0.0,
+        'round_trip': db.fake_count_dict['round_trip'] - _trip,
+    }
+
+
+def bench_row_mode(rows: int = 100000, insert_rows: int = 10000, step: int = 1000) -> typing.Dict[str, typing.Dict]:
+    """
+    行模式对比 每行耗时及内存 (无延迟)
+    :param rows: select 行数
+    :param insert_rows: insert 行数
+    :param step: 分页步长
+    :return: {用例名: 测量结果}
+    """
+    _rows = make_rows(num=rows)
+    _select_dict = {'table': 'bench', 'step': step, 'use_cache': False}
+    _db = BenchDBClass(rows=_rows)
+    _legacy = LegacyDBClass(rows=_rows)
+
+    def _insert(db: MySqlDBClass) -> None:
+        for _data in make_data(num=insert_rows):
+            db.insert(insert_dict={'table': 'bench', 'key_type_dict': _KEY_TYPE_DICT, 'data_dict': _data})
+
+    ret_dict = {
+        'select_legacy_deepcopy': measure(lambda: _legacy.select(select_dict=dict(_select_dict)), num=rows),
+        'select_dict': measure(lambda: _db.select(select_dict=dict(_select_dict)), num=rows),
+        'select_row': measure(lambda: _db.select(select_dict=dict(_select_dict), row_type='row'), num=rows),
+        'insert_legacy_deepcopy': measure(lambda: _insert(db=_legacy), num=insert_rows, repeat=1),
+        'insert': measure(lambda: _insert(db=_db), num=insert_rows, repeat=1),
+    }
+    _db.close()
+    _legacy.close()
+    return ret_dict
+
+
+def bench_insert(insert_rows: int = 2000, latency: float = 0,
+                 batch_list: typing.Sequence[int] = (100, 1000)) -> typing.Dict[str, typing.Any]:
+    """
+    插入每秒行数及往返次数 查重开销 (有查重 / 无查重 耗时比)
+    :param insert_rows: 插入行数
+    :param latency: 每次往返模拟延迟 秒
+    :param batch_list: insert_many / upsert_many 每批行数列表
+    :return: {用例名: 测量结果, 'dedup_overhead': {用例名: 耗时比}}
+    """
+    _db = BenchDBClass(rows=[], latency=latency)
+
+    def _insert(prefix: str, unique_tuple: typing.Tuple = ()) -> None:
+        for _data in make_data(num=insert_rows, prefix=prefix):
+            _db.insert(insert_dict={'table': 'bench', 'key_type_dict': _KEY_TYPE_DICT, 'data_dict': _data},
+                       unique_tuple=unique_tuple)
+
+    def _insert_many(prefix: str, batch_size: int, unique_tuple: typing.Tuple = ()) -> None:
+        _db.insert_many(table='bench', rows=make_data(num=insert_rows, prefix=prefix), key_type_dict=_KEY_TYPE_DICT,
+                        batch_size=batch_size, unique_tuple=unique_tuple)
+
+    def _upsert_many(prefix: str, batch_size: int) -> None:
+        _db.upsert_many(table='bench', rows=make_data(num=insert_rows, prefix=prefix), key_type_dict=_KEY_TYPE_DICT,
+                        batch_size=batch_size)
+
+    ret_dict = {
+        'insert': measure_trip(db=_db, func=lambda: _insert(prefix='insert'), num=insert_rows),
+        'insert_unique': measure_trip(db=_db, func=lambda: _insert(prefix='insert_unique', unique_tuple=('name',)),
+                                      num=insert_rows),
+    }
+    for _batch in batch_list:
+        ret_dict[f"insert_many_{_batch}"] = measure_trip(
+            db=_db, func=lambda: _insert_many(prefix=f"many_{_batch}", batch_size=_batch), num=insert_rows)
+        ret_dict[f"insert_many_{_batch}_unique"] = measure_trip(
+            db=_db, func=lambda: _insert_many(prefix=f"many_unique_{_batch}", batch_size=_batch,
+                                              unique_tuple=('name',)), num=insert_rows)
+        ret_dict[f"upsert_many_{_batch}"] = measure_trip(
+            db=_db, func=lambda: _upsert_many(prefix=f"upsert_{_batch}", batch_size=_batch), num=insert_rows)
+    ret_dict['dedup_overhead'] = {
+        _name: round(ret_dict[f"{_name}_unique"]['seconds'] / ret_dict[_name]['seconds'], 3)
+        for _name in ['insert'] + [f"insert_many_{_b}" for _b in batch_list] if ret_dict[_name]['seconds']
+    }
+    _db.close()
+    return ret_dict
+
+
+def bench_select(size_list: typing.Sequence[int] = (1000, 10000, 100000), step_list: typing.Sequence[int] = (100, 1000),
+                 latency: float = 0) -> typing.List[typing.Dict]:
+    """
+    不同表大小及分页步长下 查询每秒行数及往返次数 (不使用缓存)
+    :param size_list: 表行数列表
+    :param step_list: 分页步长列表
+    :param latency: 每次往返模拟延迟 秒
+    :return: [{'size', 'step', 'select', 'select_row', 'select_yield', 'select_yield_seek'}]
+    """
+    ret_list = []
+    for _size in size_list:
+        _db = BenchDBClass(rows=make_rows(num=_size), latency=latency)
+        for _step in step_list:
+            _select_dict = {'table': 'bench', 'step': _step, 'use_cache': False}
+            ret_list.append({
+                'size': _size,
+                'step': _step,
+                'select': measure_trip(db=_db, func=lambda: _db.select(select_dict=dict(_select_dict)), num=_size),
+                'select_row': measure_trip(
+                    db=_db, func=lambda: _db.select(select_dict=dict(_select_dict), row_type='row'), num=_size),
+                'select_yield': measure_trip(
+                    db=_db, func=lambda: sum(1 for _ in _db.select_yield(select_dict=dict(_select_dict))), num=_size),
+                'select_yield_seek': measure_trip(
+                    db=_db, func=lambda: sum(1 for _ in _db.select_yield(select_dict={**_select_dict,
+                                                                                      'seek_key': 'id'})),
+                    num=_size),
+            })
+        _db.close()
+    return ret_list
+
+
+def bench_cache(query_num: int = 2000, step: int = 100, point_num: int = 10) -> typing.List[typing.Dict]:
+    """
+    结果缓存内存增长 每次查询条件不同 (均写入缓存)
+    :param query_num: 查询次数
+    :param step: 每次查询行数
+    :param point_num: 记录点数
+    :return: [{'query', 'num', 'bytes', 'traced_bytes', 'hit', 'miss', 'evict'}]
+    """
+    _db = BenchDBClass(rows=make_rows(num=step))
+    ret_list = []
+    tracemalloc.start()
+    try:
+        for _i in range(1, query_num + 1):
+            _db.select(select_dict={'table': 'bench', 'condition': f"{_i} = {_i}", 'step': step})
+            if _i % max(query_num // point_num, 1) == 0:
+                _stats = _db.cache_stats()
+                ret_list.append({
+                    'query': _i,
+                    'num': _stats['num'],
+                    'bytes': _stats['bytes'],
+                    'traced_bytes': tracemalloc.get_traced_memory()[0],
+                    'hit': _stats['hit'],
+                    'miss': _stats['miss'],
+                    'evict': _stats['evict'],
+                })
+    finally:
+        tracemalloc.stop()
+    _db.close()
+    return ret_list
+
+
+def bench_builder(number: int = 20000) -> typing.Dict[str, float]:
+    """
+    sql生成方法单次耗时 微秒 (取3轮最小值)
+    :param number: 每轮执行次数
+    :return: {方法: 单次耗时}
+    """
+    _db = BenchDBClass(rows=[])
+    _data = make_data(num=1)[0]
+    _case_dict = {
+        'get_insert': lambda: _db.get_insert(table='bench', data_dict=_data, key_type_dict=_KEY_TYPE_DICT),
+        'get_insert_args': lambda: _db.get_insert_args(table='bench', data_dict=_data, key_type_dict=_KEY_TYPE_DICT),
+        'get_select': lambda: _db.get_select(table='bench', condition='`id` > 10', step=1000),
+        'item_data_2_str_str': lambda: _db.item_data_2_str(data="it's a string", value_type=str),
+        'item_data_2_str_int': lambda: _db.item_data_2_str(data='123', value_type=int),
+        'item_data_2_str_float': lambda: _db.item_data_2_str(data=1.5, value_type=float),
+    }
+    ret_dict = {_name: round(min(timeit.repeat(_func, number=number, repeat=3)) / number * 1e6, 4)
+                for _name, _func in _case_dict.items()}
+    _db.close()
+    return ret_dict
+
+
+def run(case_list: typing.Sequence[str] = tuple(_CASE_LIST), latency: float = 0,
+        size_list: typing.Sequence[int] = (1000, 10000, 100000), step_list: typing.Sequence[int] = (100, 1000),
+        rows: int = 100000, insert_rows: int = 2000) -> typing.Dict:
+    """
+    运行基准
+    :param case_list: 用例列表 见 _CASE_LIST
+    :param latency: 每次往返模拟延迟 秒 (insert / select 用例)
+    :param size_list: select 用例表行数列表
+    :param step_list: select 用例分页步长列表
+    :param rows: row_mode 用例 select 行数
+    :param insert_rows: insert / row_mode 用例插入行数
+    :return: {'meta': 环境及参数, 用例名: 结果}
+    """
+    for _case in case_list:
+        if _case not in _CASE_LIST:
+            raise Exception(f"用例错误，仅支持选项：{', '.join(_CASE_LIST)}")
+    ret_dict = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'pymysql': pymysql.__version__,
+            'latency': latency,
+            'size_list': list(size_list),
+            'step_list': list(step_list),
+            'rows': rows,
+            'insert_rows': insert_rows,
+            'seconds': {},  # 各用例耗时
+        },
+    }
+    for _case in case_list:
+        _start = time.perf_counter()
+        if _case == 'row_mode':
+            ret_dict[_case] = bench_row_mode(rows=rows, insert_rows=insert_rows)
+        elif _case == 'insert':
+            ret_dict[_case] = bench_insert(insert_rows=insert_rows, latency=latency)
+        elif _case == 'select':
+            ret_dict[_case] = bench_select(size_list=size_list, step_list=step_list, latency=latency)
+        elif _case == 'cache':
+            ret_dict[_case] = bench_cache()
+        else:
+            ret_dict[_case] = bench_builder()
+        ret_dict['meta']['seconds'][_case] = round(time.perf_counter() - _start, 3)
+    return ret_dict
+
+
+def main() -> None:
+    _parser = argparse.ArgumentParser(description='my_db_utils 性能基准 (模拟连接) 输出 JSON')
+    _parser.add_argument('--case', default=','.join(_CASE_LIST), help='用例 逗号分隔')
+    _parser.add_argument('--latency', type=float, default=0, help='每次往返模拟延迟 秒')
+    _parser.add_argument('--sizes', default='1000,10000,100000', help='select 用例表行数 逗号分隔')
+    _parser.add_argument('--steps', default='100,1000', help='select 用例分页步长 逗号分隔')
+    _parser.add_argument('--rows', type=int, default=100000, help='row_mode 用例 select 行数')
+    _parser.add_argument('--insert-rows', type=int, default=2000, help='insert / row_mode 用例插入行数')
+    _parser.add_argument('--output', default='', help='结果文件 默认输出到标准输出')
+    _args = _parser.parse_args()
+    _result_dict = run(case_list=_args.case.split(','), latency=_args.latency,
+                       size_list=[int(_s) for _s in _args.sizes.split(',')],
+                       step_list=[int(_s) for _s in _args.steps.split(',')],
+                       rows=_args.rows, insert_rows=_args.insert_rows)
+    _json = json.dumps(_result_dict, ensure_ascii=False, indent=2)
+    if _args.output:
+        with open(_args.output, 'w', encoding='utf-8') as _file:
+            _file.write(_json)
+    else:
+        print(_json)
+
+
+if __name__ == '__main__':
+    main()
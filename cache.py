@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+import collections
+import sys
+import threading
+import time
+import typing
+
+_MISS = object()  # 缓存未命中标记
+
+
+class LRUCache(object):
+    """
+    查询结果缓存
+        最大条数 + 近似字节数上限 超出按最近最少使用淘汰
+        可选过期时间 (整体默认值 / 单条指定)
+        可选标签 按标签批量失效 (如按表名)
+        兼容字典用法: key in cache / cache[key] / cache[key] = value
+    """
+
+    def __init__(self, max_num: int = 1000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 0) -> None:
+        """
+        :param max_num: 最大缓存条数 0为不限制
+        :param max_bytes: 最大缓存字节数 (近似值) 0为不限制
+        :param ttl: 默认过期时间 秒 0为不过期
+        """
+        self.max_num = max_num
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data_dict = collections.OrderedDict()  # {key: (value, 字节数, 过期时间, 标签元组)}
+        self._tag_dict = {}  # {标签: {key}}
+        self._bytes = 0  # 当前缓存字节数
+        self._lock = threading.RLock()
+        self.count_dict = {
+            'hit': 0,  # 命中次数
+            'miss': 0,  # 未命中次数
+            'evict': 0,  # 淘汰次数 (含过期)
+            'invalidate': 0,  # 按标签失效条数
+        }
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """
+        获取缓存
+        :param key: 缓存键
+        :param default: 不存在时返回值
+        :return:
+        """
+        with self._lock:
+            _item = self._data_dict.get(key)
+            if _item is None or (_item[2] and _item[2] < time.monotonic()):
+                if _item is not None:
+                    self._remove(key=key)
+                    self.count_dict['evict'] += 1
+                self.count_dict['miss'] += 1
+                return default
+            self._data_dict.move_to_end(key)  # 标记为最近使用
+            self.count_dict['hit'] += 1
+            return _item[0]
+
+    def set(self, key: typing.Hashable, value: typing.Any, ttl: typing.Optional[float] = None,
+            tags: typing.Iterable[typing.Hashable] = ()) -> None:
+        """
+        写入缓存
+        :param key: 缓存键
+        :param value: 缓存数据
+        :param ttl: 过期时间 秒 默认使用整体设置 0为不过期
+        :param tags: 标签 用于 invalidate 批量失效
+        :return:
+        """
+        tags = tuple(tags)
+        _ttl = self.ttl if ttl is None else ttl
+        _size = self.sizeof(data=key) + self.sizeof(data=value)
+        # 单条超出字节上限 不缓存
+        if self.max_bytes and _size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data_dict:
+                self._remove(key=key)
+            self._data_dict[key] = (value, _size, time.monotonic() + _ttl if _ttl else 0, tags)
+            self._bytes += _size
+            for _tag in tags:
+                self._tag_dict.setdefault(_tag, set()).add(key)
+            # 超出上限 淘汰最久未使用
+            while self._data_dict and ((self.max_num and len(self._data_dict) > self.max_num)
+                                       or (self.max_bytes and self._bytes > self.max_bytes)):
+                self._remove(key=next(iter(self._data_dict)))
+                self.count_dict['evict'] += 1
+
+    def pop(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """
+        删除缓存
+        :param key: 缓存键
+        :param default: 不存在时返回值
+        :return:
+        """
+        with self._lock:
+            if key not in self._data_dict:
+                return default
+            return self._remove(key=key)
+
+    def invalidate(self, tag: typing.Hashable) -> int:
+        """
+        按标签失效缓存
+        :param tag: 标签
+        :return: 失效条数
+        """
+        with self._lock:
+            _key_set = self._tag_dict.pop(tag, set())
+            for _key in _key_set:
+                self._remove(key=_key)
+            self.count_dict['invalidate'] += len(_key_set)
+            return len(_key_set)
+
+    def clear(self) -> None:
+        """
+        清空缓存
+        :return:
+        """
+        with self._lock:
+            self._data_dict.clear()
+            self._tag_dict.clear()
+            self._bytes = 0
+
+    def stats(self) -> typing.Dict:
+        """
+        缓存统计
+        :return: {'hit', 'miss', 'evict', 'invalidate', 'num', 'bytes'}
+        """
+        with self._lock:
+            return {
+                **self.count_dict,
+                'num': len(self._data_dict),
+                'bytes': self._bytes,
+            }
+
+    def _remove(self, key: typing.Hashable) -> typing.Any:
+        """
+        移除缓存条目 (需持有锁)
+        :param key: 缓存键
+        :return: 缓存数据
+        """
+        _value, _size, _, _tags = self._data_dict.pop(key)
+        self._bytes -= _size
+        for _tag in _tags:
+            _key_set = self._tag_dict.get(_tag)
+            if _key_set is not None:
+                _key_set.discard(key)
+                if not _key_set:
+                    del self._tag_dict[_tag]
+        return _value
+
+    @staticmethod
+    def sizeof(data: typing.Any, sample_num: int = 10) -> int:
+        """
+        估算数据字节数 结果集按前sample_num行平均值估算 字典 (如执行信息 {'results': 结果集, ...}) 计入各值
+        :param data: 数据
+        :param sample_num: 采样行数
+        :return:
+        """
+        ret_size = sys.getsizeof(data)
+        if isinstance(data, dict):
+            return ret_size + sum(LRUCache.sizeof(data=_v, sample_num=sample_num) for _v in data.values())
+        if isinstance(data, (list, tuple)) and data:
+            _sample_size = 0
+            for _row in data[:sample_num]:
+                _sample_size += sys.getsizeof(_row)
+                _values = _row.values() if isinstance(_row, dict) else _row if isinstance(_row, (list, tuple)) else ()
+                _sample_size += sum(sys.getsizeof(_v) for _v in _values)
+            ret_size += _sample_size * len(data) // min(len(data), sample_num)
+        return ret_size
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        with self._lock:
+            _item = self._data_dict.get(key)
+            return _item is not None and not (_item[2] and _item[2] < time.monotonic())
+
+    def __getitem__(self, key: typing.Hashable) -> typing.Any:
+        _value = self.get(key=key, default=_MISS)
+        if _value is _MISS:
+            raise KeyError(key)
+        return _value
+
+    def __setitem__(self, key: typing.Hashable, value: typing.Any) -> None:
+        self.set(key=key, value=value)
+
+    def __len__(self) -> int:
+        return len(self._data_dict)
+
+
+class SingleFlight(object):
+    """
+    相同键的并发调用合并为一次执行
+        第一个调用方执行 其他调用方等待并共用其结果 (异常同样共用)
+        forget 后新的调用方不再加入已在执行的调用 (如写入后需读取新数据)
+    """
+
+    def __init__(self) -> None:
+        self._call_dict = {}  # {key: {'event', 'result', 'error'}}
+        self._lock = threading.Lock()
+        self.count_dict = {
+            'call': 0,  # 实际执行次数
+            'shared': 0,  # 等待共用结果次数
+        }
+
+    def do(self, key: typing.Hashable, func: typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        执行或等待相同键的调用
+        :param key: 调用键
+        :param func: 执行方法
+        :return: 执行结果
+        """
+        with self._lock:
+            _call = self._call_dict.get(key)
+            _is_leader = _call is None
+            if _is_leader:
+                _call = self._call_dict[key] = {'event': threading.Event(), 'result': None, 'error': None}
+                self.count_dict['call'] += 1
+            else:
+                self.count_dict['shared'] += 1
+        if not _is_leader:
+            _call['event'].wait()
+            if _call['error'] is not None:
+                raise _call['error']
+            return _call['result']
+        try:
+            _call['result'] = func()
+            return _call['result']
+        except BaseException as e:
+            _call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                if self._call_dict.get(key) is _call:
+                    del self._call_dict[key]
+            _call['event'].set()
+
+    def forget(self) -> None:
+        """
+        已在执行的调用不再接受新的等待方
+        :return:
+        """
+        with self._lock:
+            self._call_dict.clear()
+
+    def stats(self) -> typing.Dict:
+        """
+        合并统计
+        :return: {'call', 'shared', 'running'}
+        """
+        with self._lock:
+            return {**self.count_dict, 'running': len(self._call_dict)}
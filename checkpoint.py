@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+断点存储
+    按名称保存断点 (字典) 用于中断后继续执行 (copy_table / select_incremental)
+    FileCheckpoint: 本地 json 文件 TableCheckpoint: 数据表
+    值支持 json 基础类型及 datetime / date / Decimal / 元组 (按类型标记编码 读取时还原)
+"""
+import datetime
+import decimal
+import json
+import os
+import threading
+import typing
+
+
+def dumps(data: typing.Any) -> str:
+    """
+    断点编码为 json 字符串
+    :param data: 断点
+    :return:
+    """
+    return json.dumps(_encode(data=data), ensure_ascii=False, sort_keys=True)
+
+
+def loads(data: str) -> typing.Any:
+    """
+    json 字符串解码为断点
+    :param data: json 字符串
+    :return:
+    """
+    return _decode(data=json.loads(data))
+
+
+def _encode(data: typing.Any) -> typing.Any:
+    """
+    按类型标记编码
+    """
+    if isinstance(data, datetime.datetime):
+        return {'__type__': 'datetime', 'value': data.isoformat()}
+    if isinstance(data, datetime.date):
+        return {'__type__': 'date', 'value': data.isoformat()}
+    if isinstance(data, decimal.Decimal):
+        return {'__type__': 'decimal', 'value': str(data)}
+    if isinstance(data, tuple):
+        return {'__type__': 'tuple', 'value': [_encode(data=_v) for _v in data]}
+    if isinstance(data, list):
+        return [_encode(data=_v) for _v in data]
+    if isinstance(data, dict):
+        return {_k: _encode(data=_v) for _k, _v in data.items()}
+    return data
+
+
+def _decode(data: typing.Any) -> typing.Any:
+    """
+    按类型标记解码
+    """
+    if isinstance(data, list):
+        return [_decode(data=_v) for _v in data]
+    if not isinstance(data, dict):
+        return data
+    _type = data.get('__type__')
+    if _type == 'datetime':
+        return datetime.datetime.fromisoformat(data['value'])
+    if _type == 'date':
+        return datetime.date.fromisoformat(data['value'])
+    if _type == 'decimal':
+        return decimal.Decimal(data['value'])
+    if _type == 'tuple':
+        return tuple(_decode(data=_v) for _v in data['value'])
+    return {_k: _decode(data=_v) for _k, _v in data.items()}
+
+
+class FileCheckpoint(object):
+    """
+    本地文件断点存储 所有断点保存在一个 json 文件中
+        写入时先写临时文件再替换 中断时不会损坏已有断点
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: 文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> typing.Optional[typing.Dict]:
+        """
+        读取断点
+        :param name: 断点名称
+        :return: 断点 不存在为None
+        """
+        with self._lock:
+            return self._load().get(name)
+
+    def set(self, name: str, value: typing.Dict) -> None:
+        """
+        保存断点
+        :param name: 断点名称
+        :param value: 断点
+        :return:
+        """
+        with self._lock:
+            _data_dict = self._load()
+            _data_dict[name] = value
+            self._save(data_dict=_data_dict)
+
+    def delete(self, name: str) -> None:
+        """
+        删除断点
+        :param name: 断点名称
+        :return:
+        """
+        with self._lock:
+            _data_dict = self._load()
+            if _data_dict.pop(name, None) is not None:
+                self._save(data_dict=_data_dict)
+
+    def _load(self) -> typing.Dict:
+        """
+        读取文件 (需持有锁)
+        :return: {断点名称: 断点}
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as _file:
+            _text = _file.read()
+        return loads(data=_text) if _text.strip() else {}
+
+    def _save(self, data_dict: typing.Dict) -> None:
+        """
+        写入文件 (需持有锁)
+        :param data_dict: {断点名称: 断点}
+        :return:
+        """
+        _tmp_path = f"{self.path}.tmp"
+        with open(_tmp_path, 'w', encoding='utf-8') as _file:
+            _file.write(dumps(data=data_dict))
+            _file.flush()
+            os.fsync(_file.fileno())
+        os.replace(_tmp_path, self.path)
+
+
+class TableCheckpoint(object):
+    """
+    数据表断点存储 (MySqlDBClass 实例) 不存在时自动建表
+        每次保存在事务中写入 (REPLACE) 提交后返回
+    """
+
+    def __init__(self, db: typing.Any, table: str = 'db_checkpoint') -> None:
+        """
+        :param db: MySqlDBClass 实例
+        :param table: 断点表名
+        """
+        self.db = db
+        self.table = table
+        self.db._execute(sql=f"CREATE TABLE IF NOT EXISTS `{table}` ("
+                             f"`name` VARCHAR(191) NOT NULL PRIMARY KEY, "
+                             f"`value` TEXT NOT NULL, "
+                             f"`update_time` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP)",
+                         exe_type='ddl', table=table)
+
+    def get(self, name: str) -> typing.Optional[typing.Dict]:
+        """
+        读取断点
+        :param name: 断点名称
+        :return: 断点 不存在为None
+        """
+        _results = self.db._execute(sql=f"SELECT `value` FROM `{self.table}` WHERE `name` = %s", args=[name],
+                                    table=self.table)
+        if not _results:
+            return None
+        return loads(data=self.db._row_value(row=_results[0], key='value'))
+
+    def set(self, name: str, value: typing.Dict) -> None:
+        """
+        保存断点
+        :param name: 断点名称
+        :param value: 断点
+        :return:
+        """
+        with self.db.transaction():
+            self.db._execute(sql=f"REPLACE INTO `{self.table}` (`name`, `value`) VALUES (%s, %s)",
+                             args=[name, dumps(data=value)], exe_type='upsert', table=self.table)
+
+    def delete(self, name: str) -> None:
+        """
+        删除断点
+        :param name: 断点名称
+        :return:
+        """
+        with self.db.transaction():
+            self.db._execute(sql=f"DELETE FROM `{self.table}` WHERE `name` = %s", args=[name], exe_type='delete',
+                             table=self.table)
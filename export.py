@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+分块导出
+    查询结果按块 (行元组列表) 编码写入文件 内存占用只与块大小及队列长度相关
+    编码 (含压缩) 在后台线程池中执行 写入线程按块顺序写入 与读取重叠
+    格式: csv / jsonl / parquet (需安装 pyarrow)
+    csv / jsonl 每块单独压缩后追加 (gzip / bz2 / xz 多段拼接仍为合法文件)
+"""
+import bz2
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import queue
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from pymysql.constants import FIELD_TYPE
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # 可选依赖 未安装时不支持 parquet 导出
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# 压缩方式 -> 压缩方法
+_COMPRESS_DICT = {
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+# 文件后缀 -> 压缩方式
+_COMPRESS_SUFFIX_DICT = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+}
+# 二进制字段类型 (值可能为 bytes)
+_BYTES_TYPE_SET = {FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB, FIELD_TYPE.BLOB,
+                   FIELD_TYPE.BIT, FIELD_TYPE.GEOMETRY}
+
+
+def _json_default(data: typing.Any) -> typing.Any:
+    """
+    json 编码非基础类型 日期时间转 ISO 格式 Decimal / timedelta 转字符串 bytes 按 utf-8 解码
+    """
+    if isinstance(data, (datetime.datetime, datetime.date, datetime.time)):
+        return data.isoformat()
+    if isinstance(data, bytes):
+        return data.decode('utf-8', 'backslashreplace')
+    if isinstance(data, (decimal.Decimal, datetime.timedelta)):
+        return str(data)
+    raise TypeError(f"无法编码的类型：{type(data)}")
+
+
+class ChunkWriter(object):
+    """
+    分块写入基类
+        encode: 块编码为写入数据 (在编码线程中调用 需线程安全)
+        write: 按块顺序写入 (在写入线程中调用)
+    """
+
+    def __init__(self, path: str, description: typing.Sequence, compression: str = '') -> None:
+        """
+        :param path: 文件路径
+        :param description: 游标 description
+        :param compression: 压缩方式
+        """
+        self.path = path
+        self.description = description
+        self.column_list = [_d[0] for _d in description]
+        self.compression = compression
+        self.file = None
+
+    def open(self) -> None:
+        """
+        打开文件 写入文件头
+        :return:
+        """
+        self.file = open(self.path, 'wb')
+
+    def encode(self, rows: typing.Sequence[typing.Sequence]) -> typing.Any:
+        """
+        块编码
+        :param rows: 行元组列表
+        :return: 写入数据
+        """
+        raise NotImplementedError
+
+    def write(self, data: typing.Any) -> None:
+        """
+        写入一块
+        :param data: encode 返回的数据
+        :return:
+        """
+        self.file.write(data)
+
+    def tell(self) -> int:
+        """
+        已写入字节数
+        :return:
+        """
+        return self.file.tell() if self.file is not None else 0
+
+    def close(self) -> None:
+        """
+        关闭文件
+        :return:
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _compress(self, data: bytes) -> bytes:
+        """
+        压缩一块数据
+        :param data: 源数据
+        :return:
+        """
+        return _COMPRESS_DICT[self.compression](data) if self.compression else data
+
+
+class CsvWriter(ChunkWriter):
+    """
+    csv 写入 首行为字段名 NULL 写为空字符串 utf-8 编码
+    """
+
+    def __init__(self, path: str, description: typing.Sequence, compression: str = '') -> None:
+        super().__init__(path=path, description=description, compression=compression)
+        self._bytes_index_list = [_i for _i, _d in enumerate(description) if _d[1] in _BYTES_TYPE_SET]
+
+    def open(self) -> None:
+        super().open()
+        self.file.write(self._encode_rows(rows=[self.column_list]))
+
+    def encode(self, rows: typing.Sequence[typing.Sequence]) -> bytes:
+        # 二进制类型字段 及首行值为 bytes 的字段 (binary / varbinary)
+        _index_list = sorted(set(self._bytes_index_list).union(
+            [_i for _i, _v in enumerate(rows[0]) if isinstance(_v, bytes)] if rows else []))
+        if _index_list:
+            rows = [self._decode_row(row=_row, index_list=_index_list) for _row in rows]
+        return self._encode_rows(rows=rows)
+
+    def _encode_rows(self, rows: typing.Sequence[typing.Sequence]) -> bytes:
+        """
+        行列表编码为 csv 字节
+        :param rows: 行列表
+        :return:
+        """
+        _buffer = io.StringIO()
+        csv.writer(_buffer).writerows(rows)
+        return self._compress(data=_buffer.getvalue().encode('utf-8'))
+
+    @staticmethod
+    def _decode_row(row: typing.Sequence, index_list: typing.List[int]) -> typing.List:
+        """
+        二进制字段 bytes 按 utf-8 解码
+        :param row: 行元组
+        :param index_list: 二进制字段位置
+        :return:
+        """
+        ret_row = list(row)
+        for _i in index_list:
+            if isinstance(ret_row[_i], bytes):
+                ret_row[_i] = ret_row[_i].decode('utf-8', 'backslashreplace')
+        return ret_row
+
+
+class JsonlWriter(ChunkWriter):
+    """
+    jsonl 写入 每行一个 json 对象 NULL 写为 null
+    """
+
+    def encode(self, rows: typing.Sequence[typing.Sequence]) -> bytes:
+        _column_list = self.column_list
+        _line_list = [json.dumps(dict(zip(_column_list, _row)), ensure_ascii=False, default=_json_default)
+                      for _row in rows]
+        _line_list.append('')
+        return self._compress(data='\n'.join(_line_list).encode('utf-8'))
+
+
+class ParquetWriter(ChunkWriter):
+    """
+    parquet 写入 (需安装 pyarrow) 每块一个 row group 字段类型按游标 description 确定
+        compression 为 parquet 压缩编码 (snappy / gzip / zstd / brotli / lz4 / none)
+    """
+
+    def __init__(self, path: str, description: typing.Sequence, compression: str = '') -> None:
+        if pyarrow is None:
+            raise Exception(f"导出 parquet 需安装 pyarrow")
+        super().__init__(path=path, description=description, compression=compression)
+        self.schema = pyarrow.schema([(_d[0], self._arrow_type(description=_d)) for _d in description])
+        self._writer = None
+
+    def open(self) -> None:
+        super().open()
+        self._writer = pyarrow.parquet.ParquetWriter(self.file, schema=self.schema,
+                                                     compression=self.compression or 'snappy')
+
+    def encode(self, rows: typing.Sequence[typing.Sequence]) -> typing.Any:
+        _column_list = list(zip(*rows)) if rows else [() for _ in self.column_list]
+        _array_list = [pyarrow.array(_c, type=_f.type) for _c, _f in zip(_column_list, self.schema)]
+        return pyarrow.Table.from_arrays(_array_list, schema=self.schema)
+
+    def write(self, data: typing.Any) -> None:
+        self._writer.write_table(data)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        super().close()
+
+    @staticmethod
+    def _arrow_type(description: typing.Sequence) -> typing.Any:
+        """
+        游标字段类型转 arrow 类型
+        :param description: 单个字段的 description (name, type_code, display_size, internal_size, precision, scale)
+        :return:
+        """
+        _type_code = description[1]
+        if _type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24,
+                          FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR):
+            return pyarrow.int64()
+        if _type_code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE):
+            return pyarrow.float64()
+        if _type_code in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+            return pyarrow.decimal128(38, description[5] or 0)
+        if _type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+            return pyarrow.timestamp('us')
+        if _type_code in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE):
+            return pyarrow.date32()
+        if _type_code == FIELD_TYPE.TIME:
+            return pyarrow.duration('us')
+        if _type_code in (FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB, FIELD_TYPE.BLOB,
+                          FIELD_TYPE.BIT, FIELD_TYPE.GEOMETRY):
+            return pyarrow.binary()
+        return pyarrow.string()
+
+
+# 导出格式 -> 写入类
+WRITER_DICT = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def get_format(path: str, file_format: str = '', compression: typing.Optional[str] = None) -> typing.Tuple[str, str]:
+    """
+    获取导出格式及压缩方式 未指定时按文件后缀判断 (如 .csv.gz / .jsonl / .parquet)
+    :param path: 文件路径
+    :param file_format: 导出格式 csv / jsonl / parquet
+    :param compression: 压缩方式 csv / jsonl: gzip / bz2 / xz parquet: 压缩编码
+    :return: (导出格式, 压缩方式)
+    """
+    _root, _suffix = os.path.splitext(path.lower())
+    if compression is None:
+        compression = _COMPRESS_SUFFIX_DICT.get(_suffix, '')
+    if _suffix in _COMPRESS_SUFFIX_DICT:
+        _suffix = os.path.splitext(_root)[1]
+    file_format = file_format or _suffix.lstrip('.')
+    if file_format == 'json':
+        file_format = 'jsonl'
+    if file_format not in WRITER_DICT:
+        raise Exception(f"导出格式错误，仅支持选项：{', '.join(WRITER_DICT)}")
+    if file_format == 'parquet' and pyarrow is None:
+        raise Exception(f"导出 parquet 需安装 pyarrow")
+    if file_format != 'parquet' and compression and compression not in _COMPRESS_DICT:
+        raise Exception(f"压缩方式错误，仅支持选项：{', '.join(_COMPRESS_DICT)}")
+    return file_format, compression
+
+
+def write_chunks(chunks: typing.Iterable[typing.Tuple[typing.Sequence, typing.Sequence]],
+                 writer_factory: typing.Callable[[typing.Sequence], ChunkWriter], writer_num: int = 1,
+                 queue_size: int = 2, callback: typing.Optional[typing.Callable[[typing.Dict], None]] = None,
+                 empty_description: typing.Optional[typing.Callable[[], typing.Sequence]] = None) -> typing.Dict:
+    """
+    分块写入
+        当前线程读取块 提交到编码线程池 写入线程按顺序取出编码结果写入
+        同时在内存中的块数不超过 queue_size + 2
+    :param chunks: (description, 行元组列表) 迭代器
+    :param writer_factory: 按第一块的 description 创建写入实例
+    :param writer_num: 编码线程数 为0时在当前线程中编码及写入
+    :param queue_size: 等待写入的块数上限
+    :param callback: 每块写入后回调 (在写入线程中调用) 参数 {'rows', 'chunks', 'bytes', 'seconds'}
+    :param empty_description: 无数据时获取 description 的方法 用于写入只有文件头的文件
+    :return: {'rows', 'chunks', 'bytes', 'seconds', 'rows_per_second', 'bytes_per_second'}
+    """
+    ret_dict = {'rows': 0, 'chunks': 0, 'bytes': 0, 'seconds': 0.0}
+    _start = time.perf_counter()
+    _chunk_iter = iter(chunks)
+    _first = next(_chunk_iter, None)
+    if _first is None:
+        if empty_description is None:
+            return _rate(info=ret_dict)
+        _first = (empty_description(), [])
+    _writer = writer_factory(_first[0])
+    _writer.open()
+
+    def _write(data: typing.Any, row_num: int) -> None:
+        _writer.write(data)
+        ret_dict['rows'] += row_num
+        ret_dict['chunks'] += 1
+        ret_dict['bytes'] = _writer.tell()
+        ret_dict['seconds'] = time.perf_counter() - _start
+        if callback:
+            callback(dict(ret_dict))
+
+    try:
+        if writer_num <= 0:
+            for _description, _rows in _iter_chunks(first=_first, chunk_iter=_chunk_iter):
+                _write(data=_writer.encode(rows=_rows), row_num=len(_rows))
+        else:
+            _write_pipeline(chunk_iter=_iter_chunks(first=_first, chunk_iter=_chunk_iter), writer=_writer,
+                            write=_write, writer_num=writer_num, queue_size=queue_size)
+    finally:
+        _writer.close()
+    ret_dict['bytes'] = os.path.getsize(_writer.path)
+    ret_dict['seconds'] = time.perf_counter() - _start
+    return _rate(info=ret_dict)
+
+
+def _iter_chunks(first: typing.Tuple, chunk_iter: typing.Iterator) -> typing.Generator[typing.Tuple, None, None]:
+    """
+    拼接已读取的第一块 (无数据时的空块不写入)
+    """
+    if first[1]:
+        yield first
+    yield from chunk_iter
+
+
+def _write_pipeline(chunk_iter: typing.Iterator, writer: ChunkWriter, write: typing.Callable,
+                    writer_num: int, queue_size: int) -> None:
+    """
+    读取 / 编码 / 写入 流水线
+    :param chunk_iter: 块迭代器
+    :param writer: 写入实例
+    :param write: 写入方法
+    :param writer_num: 编码线程数
+    :param queue_size: 等待写入的块数上限
+    :return:
+    """
+    _queue = queue.Queue(maxsize=max(queue_size, 1))  # (编码 future, 行数) 按块顺序
+    _stop = threading.Event()  # 写入失败
+    _error_list = []
+
+    def _write_loop() -> None:
+        while True:
+            _item = _queue.get()
+            if _item is None:
+                return
+            if _error_list:
+                continue  # 已失败 取出剩余块
+            try:
+                write(data=_item[0].result(), row_num=_item[1])
+            except Exception as e:
+                _error_list.append(e)
+                _stop.set()
+                logger.error(f"导出写入失败：{writer.path} 异常：{e}")
+
+    _thread = threading.Thread(target=_write_loop, name='export-writer', daemon=True)
+    _thread.start()
+    with ThreadPoolExecutor(max_workers=writer_num, thread_name_prefix='export-encode') as _executor:
+        try:
+            for _description, _rows in chunk_iter:
+                if _stop.is_set():
+                    break
+                _queue.put((_executor.submit(writer.encode, _rows), len(_rows)))
+        finally:
+            _queue.put(None)
+            _thread.join()
+    if _error_list:
+        raise _error_list[0]
+
+
+def _rate(info: typing.Dict) -> typing.Dict:
+    """
+    补充每秒行数及字节数
+    :param info: {'rows', 'chunks', 'bytes', 'seconds'}
+    :return:
+    """
+    _seconds = info['seconds']
+    info['rows_per_second'] = info['rows'] / _seconds if _seconds else 0.0
+    info['bytes_per_second'] = info['bytes'] / _seconds if _seconds else 0.0
+    return info
@@ -1,10 +1,99 @@
 # -*- coding: utf-8 -*-
-import copy
+import array
+import contextlib
+import itertools
+import logging
+import os
+import queue
 import re
+import tempfile
+import threading
 import time
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
 import pymysql
+import pymysql.charset
+import pymysql.converters
+
+try:
+    import numpy
+except ImportError:  # 可选依赖 未安装时列式查询返回 array.array / list
+    numpy = None
+
+from .cache import LRUCache, SingleFlight
+from .export import WRITER_DICT, get_format, write_chunks
+from .pool import ConnectionPool
+from .row import Row
+from .stats import QueryStats
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()  # 缓存未命中标记
+# 表结构数据类型 -> 字段类型
+_INT_TYPE_SET = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'bit', 'year'}
+_FLOAT_TYPE_SET = {'float', 'double', 'real', 'decimal', 'numeric'}
+
+
+def _to_int(data: typing.Any) -> int:
+    """
+    整型转换 空值转0
+    """
+    return int(data) if data or data == 0 else 0
+
+
+def _to_float(data: typing.Any) -> float:
+    """
+    浮点型转换 空值转0.0
+    """
+    return float(data) if data or data == 0 else 0.0
+
+
+def _to_str(data: typing.Any) -> typing.Any:
+    """
+    字符串类转换 浮点型转整型 空值转空字符串
+    """
+    if isinstance(data, float):
+        data = int(data)
+    return data if data else ''
+
+
+def _nullable(convert: typing.Callable) -> typing.Callable:
+    """
+    可为NULL字段 None 保持为 None
+    :param convert: 类型转换方法
+    :return:
+    """
+    def _convert(data: typing.Any) -> typing.Any:
+        return None if data is None else convert(data)
+    return _convert
+
+
+_CONVERTER_DICT = {
+    int: _to_int,
+    float: _to_float,
+}
+# 批量写入模式 -> 语句开头
+_INSERT_HEAD_DICT = {
+    'insert': 'INSERT INTO',
+    'update': 'INSERT INTO',  # ON DUPLICATE KEY UPDATE
+    'ignore': 'INSERT IGNORE INTO',
+    'replace': 'REPLACE INTO',
+}
+# 多行写入执行信息 Records: 3  Duplicates: 1  Warnings: 0
+_RECORDS_RE = re.compile(r'Records:\s*(\d+)\s+Duplicates:\s*(\d+)')
+# LOAD DATA 执行信息 Records: 3  Deleted: 0  Skipped: 0  Warnings: 0
+_SKIPPED_RE = re.compile(r'Skipped:\s*(\d+)')
+# LOAD DATA 默认格式转义 (ESCAPED BY '\\')
+_TSV_ESCAPE_TABLE = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+# LOAD DATA 二进制数据转义 (按字节 不解码)
+_TSV_BYTES_ESCAPE_DICT = {b'\\': b'\\\\', b'\t': b'\\t', b'\n': b'\\n', b'\r': b'\\r', b'\0': b'\\0'}
+_TSV_BYTES_ESCAPE_RE = re.compile(rb'[\\\t\n\r\0]')
+# 列式查询 数值列 array.array 类型码 -> numpy 类型
+_TYPECODE_DICT = {
+    'q': 'int64',
+    'd': 'float64',
+}
 
 
 class MySqlDBClass(object):
@@ -12,34 +101,114 @@ class MySqlDBClass(object):
     mysql操作类
     """
 
+    # 写入语句表名识别
+    _write_table_re = re.compile(
+        r'\s*(?:INSERT(?:\s+IGNORE)?(?:\s+INTO)?|REPLACE(?:\s+INTO)?|UPDATE(?:\s+IGNORE)?|DELETE\s+FROM'
+        r'|TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|LOAD\s+DATA.*?\s+INTO\s+TABLE)'
+        r'\s+([`\w.]+)', flags=re.I | re.S)
+    cursor_dict = {
+        'tuple': pymysql.cursors.Cursor,
+        'tuple_ss': pymysql.cursors.SSCursor,
+        'dict': pymysql.cursors.DictCursor,
+        'dict_ss': pymysql.cursors.SSDictCursor,
+    }
+
     def __init__(self, host: str, port: int, user: str, password: str, db: str, charset: str = 'utf8',
-                 commit_num: int = 1000, cursor_str: str = 'dict') -> None:
-        _cursor_dict = {
-            'tuple': pymysql.cursors.Cursor,
-            'tuple_ss': pymysql.cursors.SSCursor,
-            'dict': pymysql.cursors.DictCursor,
-            'dict_ss': pymysql.cursors.SSDictCursor,
+                 commit_num: int = 1000, cursor_str: str = 'dict', cache_num: int = 1000,
+                 cache_bytes: int = 64 * 1024 * 1024, cache_ttl: float = 0, cache: typing.Any = None,
+                 pool_min: int = 0, pool_max: int = 0, pool_timeout: float = 30, pool_idle: float = 300,
+                 schema_ttl: float = 600, commit_seconds: float = 0, commit_bytes: int = 0,
+                 slow_seconds: float = 1.0, slow_num: int = 100, slow_sample: float = 1.0,
+                 single_flight: bool = True) -> None:
+        """
+        :param single_flight: 是否合并并发的相同查询 (相同缓存键的查询同时只执行一次 其他线程等待共用结果)
+        :param commit_num: 分组提交 未提交的写入行数达到该值时提交 (各类写入合计) 0为不按行数
+        :param commit_seconds: 分组提交 距首条未提交写入超过该时间时提交 秒 (后台定时器检查 空闲时同样提交) 0为不按时间
+        :param commit_bytes: 分组提交 未提交的写入语句字节数 (近似值) 达到该值时提交 0为不按字节数
+        :param slow_seconds: 慢查询耗时阈值 秒 超过时记录样本并输出 WARNING 日志 0为不记录
+        :param slow_num: 保留的慢查询样本条数
+        :param slow_sample: 慢查询采样比例 0~1
+        :param cursor_str: 游标类型
+        :param cache_num: 结果缓存最大条数 0为不限制
+        :param cache_bytes: 结果缓存最大字节数 (近似值) 0为不限制
+        :param cache_ttl: 结果缓存过期时间 秒 0为不过期
+        :param cache: 自定义缓存对象 需支持 get(key, default) / cache[key] = value 默认使用 LRUCache
+        :param pool_min: 连接池最小连接数
+        :param pool_max: 连接池最大连接数 大于0时使用连接池模式 每次执行借出连接 可多线程共用实例
+            连接池模式下 写入语句执行后立即提交 (分组提交参数不生效)
+        :param pool_timeout: 连接池排队等待超时时间 秒
+        :param pool_idle: 连接池空闲连接回收时间 秒
+        :param schema_ttl: 表结构缓存过期时间 秒 0为不过期
+        """
+        if cursor_str not in self.cursor_dict:
+            raise Exception(f"参数cursor_str错误，仅支持选项：{', '.join(self.cursor_dict)}")
+        self.cursor_str = cursor_str  # 游标类型
+        # 连接参数 用于创建独立连接
+        self._conn_kwargs = {
+            'host': host,
+            'port': port,
+            'user': user,
+            'password': password,
+            'db': db,
+            'charset': charset,
         }
-        if cursor_str not in _cursor_dict:
-            raise Exception(f"参数cursor_str错误，仅支持选项：{', '.join(_cursor_dict)}")
-        # 创建连接
-        self.conn = pymysql.Connection(host=host, port=port, user=user, password=password, db=db, charset=charset,
-                                       cursorclass=_cursor_dict[cursor_str])
-        print(f"创建连接：地址：{host} 端口：{port} 用户名：{user} 数据库：{db}")
-        self.cursor = self.conn.cursor()  # 获取游标
-        self.cache_dict = {
-            # 'insert': dict(),  # 增 缓存 字典
-            # 'delete': dict(),  # 删 缓存 字典
-            # 'update': dict(),  # 改 缓存 字典
-            # 'select': dict(),  # 查 缓存 字典
+        self._lock = threading.RLock()  # 单连接模式执行锁 / 统计锁
+        # 执行统计 耗时直方图 / 钩子 / 慢查询
+        self.query_stats = QueryStats(slow_seconds=slow_seconds, slow_num=slow_num, slow_sample=slow_sample)
+        self._local = threading.local()  # 线程事务状态 (连接池模式下绑定的连接)
+        self.pending_dict = {'num': 0, 'rows': 0, 'bytes': 0, 'start': 0.0}  # 单连接模式 未提交的写入
+        self.commit_dict = {
+            'commit': 0,  # 提交次数
+            'rows': 0,  # 提交行数
+            'seconds': 0.0,  # 提交总耗时
+            'max_seconds': 0.0,  # 单次提交最大耗时
+            'last_seconds': 0.0,  # 最近一次提交耗时
         }
+        if pool_max > 0:
+            # 连接池模式
+            self.pool = ConnectionPool(creator=self._new_conn, min_num=pool_min, max_num=pool_max,
+                                       timeout=pool_timeout, max_idle=pool_idle)
+            logger.info(f"创建连接池：地址：{host} 端口：{port} 用户名：{user} 数据库：{db} 连接数：{pool_min}~{pool_max}")
+        else:
+            self.pool = None
+            # 创建连接
+            self.conn = self._new_conn(cursor_str=cursor_str)
+            logger.info(f"创建连接：地址：{host} 端口：{port} 用户名：{user} 数据库：{db}")
+            self.cursor = self.conn.cursor()  # 获取游标
+        # 执行结果缓存
+        self.cache_dict = cache if cache is not None else LRUCache(max_num=cache_num, max_bytes=cache_bytes,
+                                                                   ttl=cache_ttl)
+        # 并发相同查询合并
+        self.single_flight = SingleFlight() if single_flight else None
+        # 缓存失效代数 {标签: 代数} ('' 为清空全部) 查询期间有失效时结果不写入缓存
+        self.generation_dict = {}
+        self._generation_lock = threading.Lock()
         self.count_dict = {
             'insert': 0,  # 增 数据统计
             'delete': 0,  # 删 数据统计
             'update': 0,  # 改 数据统计
+            'upsert': 0,  # 插入或更新 影响行数统计
             'select': 0,  # 查 数据统计
         }
-        self.commit_num = commit_num  # 插入数据 提交数量
+        self.commit_num = commit_num  # 分组提交 行数
+        self.commit_seconds = commit_seconds  # 分组提交 时间
+        self._commit_timer = None  # 分组提交 时间定时器 (有未提交写入时运行)
+        self.commit_bytes = commit_bytes  # 分组提交 字节数
+        self.max_packet = 0  # 服务端 max_allowed_packet 缓存
+        self.template_dict = {}  # 参数化语句模板缓存 {(类型, 表, 字段): 模板}
+        self.schema_dict = {}  # 表结构缓存 {表名: (读取时间, 字段列表, 字段转换方法字典)}
+        self.schema_ttl = schema_ttl  # 表结构缓存过期时间
+        self.charset = charset  # 字符集 用于转义
+
+    def _new_conn(self, cursor_str: str = '', **kwargs) -> pymysql.Connection:
+        """
+        按连接参数创建新连接
+        :param cursor_str: 游标类型 默认与实例一致
+        :param kwargs: 其他连接参数 (如 local_infile)
+        :return:
+        """
+        return pymysql.Connection(**self._conn_kwargs, cursorclass=self.cursor_dict[cursor_str or self.cursor_str],
+                                  **kwargs)
 
     def get_insert(self, table: str, data_dict: typing.Dict, key_type_dict: typing.Dict) -> str:
         """
@@ -66,8 +235,7 @@ class MySqlDBClass(object):
         # print(f"查询语句：{ret_sql}")  # 调试
         return ret_sql  # 返回
 
-    @staticmethod
-    def get_delete(table: str, condition: str) -> str:
+    def get_delete(self, table: str, condition: str) -> str:
         """
         获取删除语句
         :param table: 表名
@@ -101,20 +269,83 @@ class MySqlDBClass(object):
         # print(f"查询语句：{ret_sql}")  # 调试
         return ret_sql  # 返回
 
+    def get_insert_args(self, table: str, data_dict: typing.Dict,
+                        key_type_dict: typing.Optional[typing.Dict] = None) -> typing.Tuple[str, typing.List]:
+        """
+        获取参数化插入语句 语句模板按 (表, 字段) 缓存 数据作为驱动参数传入
+        :param table: 表名
+        :param data_dict: 数据字典
+        :param key_type_dict: 要新增的数据字段及类型 默认按表结构缓存获取
+        :return: (语句模板, 参数列表)
+        """
+        _converter_list = [_c for _c in self._get_converter_list(table=table, key_type_dict=key_type_dict)
+                           if _c[0] in data_dict]
+        _key_tuple = tuple(_k for _k, _ in _converter_list)
+        _args = [_convert(data_dict[_k]) for _k, _convert in _converter_list]
+        return self._get_template(kind='insert', table=table, key_tuple=_key_tuple), _args
+
+    def get_update_args(self, table: str, condition: str, update_dict: typing.Dict,
+                        update_key_dict: typing.Optional[typing.Dict] = None) -> typing.Tuple[str, typing.List]:
+        """
+        获取参数化修改语句 语句模板按 (表, 字段) 缓存 数据作为驱动参数传入
+        :param table: 表名
+        :param condition: 条件 (原样拼接 其中的%会转义)
+        :param update_dict: 要修改的字段数据
+        :param update_key_dict: 要修改的字段键-类型 默认按表结构缓存获取
+        :return: (语句模板, 参数列表)
+        """
+        _converter_list = [_c for _c in self._get_converter_list(table=table, key_type_dict=update_key_dict)
+                           if _c[0] in update_dict]
+        _key_tuple = tuple(_k for _k, _ in _converter_list)
+        _args = [_convert(update_dict[_k]) for _k, _convert in _converter_list]
+        _sql = self._get_template(kind='update', table=table, key_tuple=_key_tuple)
+        return f"{_sql}{condition.replace('%', '%%')}", _args
+
+    def _get_template(self, kind: str, table: str, key_tuple: typing.Tuple) -> str:
+        """
+        获取缓存的语句模板
+        :param kind: 模板类型
+            insert: INSERT INTO `t` (`a`, `b`) VALUES (%s, %s)
+            update: UPDATE `t` SET `a` = %s, `b` = %s WHERE (后接条件)
+            where: `a` LIKE %s AND `b` = %s (key_tuple 为 (字段, 运算符) 元组)
+        :param table: 表名
+        :param key_tuple: 字段元组
+        :return:
+        """
+        _template_key = (kind, table, key_tuple)
+        ret_sql = self.template_dict.get(_template_key)
+        if ret_sql is not None:
+            return ret_sql
+        _table = self._name_str(d=table).replace('%', '%%')
+        if kind == 'insert':
+            _key_str = ', '.join([f"`{_k}`" for _k in key_tuple]).replace('%', '%%')
+            ret_sql = f"INSERT INTO {_table} ({_key_str}) VALUES ({', '.join(['%s'] * len(key_tuple))})"
+        elif kind == 'update':
+            _set_str = ', '.join([f"`{_k}` = %s" for _k in key_tuple])
+            ret_sql = f"UPDATE {_table} SET {_set_str} WHERE "
+        elif kind == 'where':
+            ret_sql = ' AND '.join([f"`{_k}` {_op} %s" for _k, _op in key_tuple])
+        else:
+            raise Exception(f"参数kind错误：{kind}")
+        self.template_dict[_template_key] = ret_sql
+        return ret_sql
+
     def get_select(self, table: str, condition: str = r'1=1', item_key: str = r'*', start: int = 0,
-                   step: int = 1000) -> str:
+                   step: typing.Optional[int] = 1000, order_by: str = '') -> str:
         """
         获取查询语句
         :param item_key: 数据展示字段
         :param table: 表名
         :param condition: 条件
         :param start: 分页开始位置
-        :param step: 分页步长
+        :param step: 分页步长 为None时不分页
+        :param order_by: 排序字段
         :return:
         """
-        _limit = f"{start}, {step}"  # 拼接数据范围
+        _limit = f" LIMIT {start}, {step}" if step is not None else ''  # 拼接数据范围
+        _order = f" ORDER BY {order_by}" if order_by else ''  # 排序
         # 拼接查询语句
-        ret_sql = f"SELECT {item_key} FROM {self._name_str(d=table)} WHERE {condition} LIMIT {_limit}"
+        ret_sql = f"SELECT {item_key} FROM {self._name_str(d=table)} WHERE {condition}{_order}{_limit}"
         # print(f"查询语句：{ret_sql}")  # 调试
         return ret_sql  # 返回
 
@@ -129,39 +360,40 @@ class MySqlDBClass(object):
             {
                 'table': '',
                 'data_dict': {},
-                'key_type_dict': {},
+                'key_type_dict': {},  # 可选 默认按表结构缓存获取
             }
         :param print_sql: 是否打印sql语句
         :return:
         """
         # 查询数据是否存在
         _time_start = time.time()
-        # 创建查询字典
-        _select_dict = copy.deepcopy(insert_dict)
+        # 创建查询字典 (仅替换 data_dict 浅复制即可)
+        _select_dict = dict(insert_dict)
         # 是否有指定查重字段
         if unique_tuple:
             _select_dict['data_dict'] = {_k: _v for _k, _v in insert_dict['data_dict'].items() if _k in unique_tuple}
         _results_select = self.select_by_dict(**_select_dict, print_sql=print_sql)
         _time_end = time.time()
         _select_diff_time = _time_end - _time_start
-        print(f"查重时间：{_select_diff_time} 秒")
+        logger.debug(f"查重时间：{_select_diff_time} 秒")
         _results = 0
         if not _results_select:
             # 获取添加语句
-            _sql = self.get_insert(**insert_dict)
-            _cache_sql = self.get_insert(**_select_dict)  # 仅剩查重字段的插入语句
-            ret_id = self._cache_execute(sql=_sql, cache_sql=_cache_sql, exe_type='insert', print_sql=print_sql)
+            _sql, _args = self.get_insert_args(**insert_dict)
+            _cache_sql = self._cache_key(*self.get_insert_args(**_select_dict))  # 仅剩查重字段的插入语句
+            ret_id = self._cache_execute(sql=_sql, args=_args, cache_sql=_cache_sql, exe_type='insert',
+                                         print_sql=print_sql, table=insert_dict['table'])
         else:
             # 已有数据的id
             ret_id = _results_select[0]['id']
-            print(f"数据已存在， id：{ret_id}")
+            logger.info(f"数据已存在， id：{ret_id}")
             # 重复是否更新
             if update:
                 _update_dict = {
                     'table': insert_dict['table'],
                     'condition': f"`id` = {ret_id}",
                     'update_dict': insert_dict['data_dict'],
-                    'update_key_dict': insert_dict['key_type_dict'],
+                    'update_key_dict': insert_dict.get('key_type_dict'),
                 }
                 self.update(update_dict=_update_dict, print_sql=print_sql)
 
@@ -169,6 +401,439 @@ class MySqlDBClass(object):
         if return_id:
             return ret_id
 
+    def insert_many(self, table: str, rows: typing.Iterable[typing.Dict],
+                    key_type_dict: typing.Optional[typing.Dict] = None, batch_size: int = 1000, max_packet: int = 0,
+                    unique_tuple: typing.Tuple = (), id_key: str = 'id', ignore_case: bool = True,
+                    print_sql: bool = False) -> typing.List[typing.List[int]]:
+        """
+        批量插入方法 多行 VALUES (...),(...) 拼接
+        :param table: 表名
+        :param rows: 数据字典迭代器
+        :param key_type_dict: 要新增的数据字段及类型 默认按表结构缓存获取
+        :param batch_size: 每批最大行数
+        :param max_packet: 每批语句最大字节数 默认读取 max_allowed_packet
+        :param unique_tuple: 查重字段 指定时每批一次查询查重 仅插入不存在的数据
+        :param id_key: 查重时返回的id字段
+        :param ignore_case: 查重时字符串是否忽略大小写 (与 _ci 排序规则一致)
+        :param print_sql: 是否打印sql语句
+        :return: 每批数据的id列表 (依赖自增id连续分配)
+            未查重时为每批新增数据的id
+            查重时与每批输入数据一一对应 已存在数据返回已有id
+        """
+        _converter_list = self._get_converter_list(table=table, key_type_dict=key_type_dict)
+        if not unique_tuple:
+            return self._insert_rows(table=table, rows=rows, converter_list=_converter_list, batch_size=batch_size,
+                                     max_packet=max_packet, print_sql=print_sql)
+        _converter_dict = dict(_converter_list)
+        ret_id_list = []  # 每批id列表
+        for _chunk in self._chunk(data=rows, size=batch_size):
+            _id_list = self.select_exist_id(table=table, rows=_chunk, key_type_dict=key_type_dict,
+                                            unique_tuple=unique_tuple, id_key=id_key, ignore_case=ignore_case,
+                                            print_sql=print_sql)
+            # 不存在的数据 按查重字段去重 {查重值: [行号]}
+            _new_dict = {}
+            for _index, _row in enumerate(_chunk):
+                if _id_list[_index] is None:
+                    _unique = self._match_value(data_dict=_row, converter_dict=_converter_dict,
+                                                key_tuple=unique_tuple, ignore_case=ignore_case)
+                    _new_dict.setdefault(_unique, []).append(_index)
+            if _new_dict:
+                _batch_list = self._insert_rows(table=table, rows=[_chunk[_v[0]] for _v in _new_dict.values()],
+                                                converter_list=_converter_list, batch_size=batch_size,
+                                                max_packet=max_packet, print_sql=print_sql)
+                _new_id_list = [_id for _batch in _batch_list for _id in _batch]
+                for _n, _index_list in enumerate(_new_dict.values()):
+                    for _index in _index_list:
+                        _id_list[_index] = _new_id_list[_n] if _n < len(_new_id_list) else None
+            ret_id_list.append(_id_list)
+        return ret_id_list
+
+    def upsert(self, table: str, data_dict: typing.Dict, key_type_dict: typing.Optional[typing.Dict] = None,
+               mode: str = 'update', update_tuple: typing.Optional[typing.Tuple] = None,
+               print_sql: bool = False) -> typing.Dict:
+        """
+        单条插入或更新 一条语句 参数同 upsert_many
+        :return: {'rows', 'affected', 'inserted', 'updated', 'unchanged'}
+        """
+        return self.upsert_many(table=table, rows=[data_dict], key_type_dict=key_type_dict, mode=mode,
+                                update_tuple=update_tuple, print_sql=print_sql)[0]
+
+    def upsert_many(self, table: str, rows: typing.Iterable[typing.Dict],
+                    key_type_dict: typing.Optional[typing.Dict] = None, mode: str = 'update',
+                    update_tuple: typing.Optional[typing.Tuple] = None, batch_size: int = 1000, max_packet: int = 0,
+                    print_sql: bool = False) -> typing.List[typing.Dict]:
+        """
+        批量插入或更新 每批一条语句 由唯一索引判断重复 无需预先查重
+        :param table: 表名
+        :param rows: 数据字典迭代器 缺失字段按 DEFAULT 写入 (update 模式下重复时默认不更新缺失字段)
+        :param key_type_dict: 要写入的数据字段及类型 默认按表结构缓存获取
+        :param mode: 重复处理方式
+            update: INSERT ... ON DUPLICATE KEY UPDATE 更新 update_tuple 字段
+            ignore: INSERT IGNORE 忽略重复数据
+            replace: REPLACE 删除旧数据后插入
+        :param update_tuple: update 模式下重复时更新的字段 默认为本批数据中存在的字段 (按表结构时排除自增及主键字段)
+            字段集合不同的行分在不同批次 部分字段的数据重复时不会把其他字段重置为默认值
+        :param batch_size: 每批最大行数
+        :param max_packet: 每批语句最大字节数 默认读取 max_allowed_packet
+        :param print_sql: 是否打印sql语句
+        :return: 每批统计 [{'rows': 行数, 'affected': 影响行数, 'inserted': 新增数,
+            'updated': 更新数 (update 模式为值有变化的行 replace 模式为替换的行), 'unchanged': 重复未变化/忽略数}]
+        """
+        if mode not in ('update', 'ignore', 'replace'):
+            raise Exception(f"参数mode错误，仅支持选项：update, ignore, replace")
+        _converter_list = self._get_converter_list(table=table, key_type_dict=key_type_dict)
+        _skip_set = set()
+        if mode == 'update' and update_tuple is None and key_type_dict is None:
+            _skip_set = {_c['name'] for _c in self.get_schema(table=table)
+                         if _c['key'] == 'PRI' or 'auto_increment' in (_c['extra'] or '').lower()}
+        return self._insert_rows(table=table, rows=rows, converter_list=_converter_list, batch_size=batch_size,
+                                 max_packet=max_packet, print_sql=print_sql, mode=mode,
+                                 update_tuple=update_tuple, update_skip_set=_skip_set)
+
+    def select_exist_id(self, table: str, rows: typing.List[typing.Dict],
+                        key_type_dict: typing.Optional[typing.Dict] = None, unique_tuple: typing.Tuple = (),
+                        id_key: str = 'id', ignore_case: bool = True, print_sql: bool = False) -> typing.List:
+        """
+        批量查重 一次查询 WHERE (k1, k2) IN ((...), (...))
+        :param table: 表名
+        :param rows: 数据字典列表
+        :param key_type_dict: 字段及类型 默认按表结构缓存获取
+        :param unique_tuple: 查重字段
+        :param id_key: 返回的id字段
+        :param ignore_case: 字符串是否忽略大小写对应结果 (与 _ci 排序规则一致 'Foo' 对应已有的 'foo')
+        :param print_sql: 是否打印sql语句
+        :return: 与rows一一对应的已有id 不存在为None
+        """
+        if not rows:
+            return []
+        _converter_dict = dict(self._get_converter_list(table=table, key_type_dict=key_type_dict))
+        _unique_list = [self._match_value(data_dict=_row, converter_dict=_converter_dict, key_tuple=unique_tuple,
+                                          ignore_case=ignore_case) for _row in rows]
+        # 去重保序 {查重值: 参数}
+        _value_dict = {}
+        for _unique, _row in zip(_unique_list, rows):
+            if _unique not in _value_dict:
+                _value_dict[_unique] = [_converter_dict.get(_k, _to_str)(_row.get(_k)) for _k in unique_tuple]
+        _value_list = list(_value_dict.values())
+        _args = [_v for _value in _value_list for _v in _value]
+        if len(unique_tuple) == 1:
+            _condition = f"`{unique_tuple[0]}` IN ({', '.join(['%s'] * len(_value_list))})"
+        else:
+            _key_str = ', '.join([f"`{_k}`" for _k in unique_tuple])
+            _row_str = ', '.join(['(' + ', '.join(['%s'] * len(unique_tuple)) + ')'] * len(_value_list))
+            _condition = f"({_key_str}) IN ({_row_str})"
+        _select_dict = {
+            'table': table,
+            'item_key': ', '.join([f"`{_k}`" for _k in (id_key,) + tuple(unique_tuple)]),
+            'condition': _condition,
+            'args': _args,
+            'step': max(len(_value_list), 1000),
+            'use_cache': False,  # 每批查重条件不同 不缓存
+        }
+        _exist_dict = {}  # {查重值: id}
+        for _result in self.select(select_dict=_select_dict, print_sql=print_sql):
+            _unique = self._match_value(data_dict=_result, converter_dict=_converter_dict, key_tuple=unique_tuple,
+                                        ignore_case=ignore_case)
+            _exist_dict.setdefault(_unique, _result[id_key])
+        return [_exist_dict.get(_unique) for _unique in _unique_list]
+
+    def _unique_value(self, data_dict: typing.Dict, converter_dict: typing.Dict,
+                      unique_tuple: typing.Tuple) -> typing.Tuple[str, ...]:
+        """
+        获取查重字段数据字符串元组
+        :param data_dict: 数据字典
+        :param converter_dict: 字段转换方法字典
+        :param unique_tuple: 查重字段
+        :return:
+        """
+        return tuple(self._escape(data=converter_dict.get(_k, _to_str)(data_dict.get(_k))) for _k in unique_tuple)
+
+    def _insert_rows(self, table: str, rows: typing.Iterable[typing.Dict], converter_list: typing.List,
+                     batch_size: int = 1000, max_packet: int = 0, print_sql: bool = False, mode: str = 'insert',
+                     update_tuple: typing.Optional[typing.Tuple] = (),
+                     update_skip_set: typing.Collection = (), exe_type: str = '') -> typing.List:
+        """
+        按行数及字节数分批写入
+        :param table: 表名
+        :param rows: 数据字典迭代器
+        :param converter_list: 字段转换方法列表 [(字段, 转换方法)]
+        :param batch_size: 每批最大行数
+        :param max_packet: 每批语句最大字节数
+        :param print_sql: 是否打印sql语句
+        :param mode: 写入模式 insert / update / ignore / replace (见 upsert_many)
+        :param update_tuple: update 模式下重复时更新的字段 None为每行存在的字段 (字段集合变化时另起一批)
+        :param update_skip_set: update_tuple 为None时不更新的字段 (主键 / 自增)
+        :param exe_type: 执行类型 用于数量及执行统计 默认按写入模式 (insert / upsert)
+        :return: insert 模式为每批新增数据的id列表 其他模式为每批统计 (见 _upsert_batch)
+        """
+        _max_bytes = self._get_batch_bytes(max_packet=max_packet)
+        _key_list = [_k for _k, _ in converter_list]  # 新增数据字段列表
+        _sql_head = f"{_INSERT_HEAD_DICT[mode]} {self._name_str(d=table)} " \
+                    f"({', '.join([f'`{_k}`' for _k in _key_list])}) VALUES "
+        _is_row_update = mode == 'update' and update_tuple is None  # 按行中存在的字段更新
+
+        def _get_tail(update_key_tuple: typing.Tuple) -> str:
+            if mode != 'update':
+                return ''
+            # 无可更新字段时 更新为原值 仅忽略重复
+            _update_list = [f"`{_k}` = VALUES(`{_k}`)" for _k in update_key_tuple] or \
+                [f"`{_key_list[0]}` = `{_key_list[0]}`"]
+            return f" ON DUPLICATE KEY UPDATE {', '.join(_update_list)}"
+
+        def _execute_batch(value_list: typing.List[str], sql_tail: str) -> typing.Any:
+            _sql = _sql_head + ','.join(value_list) + sql_tail
+            if mode == 'insert':
+                return self._insert_batch(sql=_sql, table=table, print_sql=print_sql, exe_type=exe_type or 'insert')
+            return self._upsert_batch(sql=_sql, table=table, mode=mode, row_num=len(value_list), print_sql=print_sql,
+                                      exe_type=exe_type or 'upsert')
+
+        _head_bytes = len(_sql_head.encode('utf-8'))
+        _update_tuple = None if _is_row_update else update_tuple or ()  # 当前批次更新字段
+        _sql_tail = '' if _is_row_update else _get_tail(update_key_tuple=_update_tuple)
+        ret_batch_list = []  # 每批结果列表
+        _value_list = []  # 当前批次数据字符串列表
+        _value_bytes = _head_bytes + len(_sql_tail.encode('utf-8'))  # 当前批次语句字节数
+        for _row in rows:
+            _value_str = self._get_insert_value(data_dict=_row, converter_list=converter_list)
+            _bytes = len(_value_str.encode('utf-8')) + 1  # 含逗号
+            _row_update_tuple = _update_tuple
+            if _is_row_update:
+                _row_update_tuple = tuple(_k for _k in _key_list if _k in _row and _k not in update_skip_set)
+            # 达到批次行数或字节数 或更新字段变化 先执行当前批次
+            if _value_list and (len(_value_list) >= batch_size or _value_bytes + _bytes > _max_bytes or
+                                _row_update_tuple != _update_tuple):
+                ret_batch_list.append(_execute_batch(value_list=_value_list, sql_tail=_sql_tail))
+                _value_list = []
+            if not _value_list:
+                if _is_row_update:
+                    _update_tuple = _row_update_tuple
+                    _sql_tail = _get_tail(update_key_tuple=_update_tuple)
+                _value_bytes = _head_bytes + len(_sql_tail.encode('utf-8'))
+            _value_list.append(_value_str)
+            _value_bytes += _bytes
+        if _value_list:
+            ret_batch_list.append(_execute_batch(value_list=_value_list, sql_tail=_sql_tail))
+        return ret_batch_list
+
+    def _get_insert_value(self, data_dict: typing.Dict, converter_list: typing.List) -> str:
+        """
+        获取单行插入数据字符串 缺失字段使用 DEFAULT
+        :param data_dict: 数据字典
+        :param converter_list: 字段转换方法列表 [(字段, 转换方法)]
+        :return: (v1, v2, ...)
+        """
+        _escape = self._escape
+        return '(' + ', '.join([_escape(data=_convert(data_dict[_key])) if _key in data_dict else 'DEFAULT'
+                                for _key, _convert in converter_list]) + ')'
+
+    def _insert_batch(self, sql: str, table: str = '', print_sql: bool = False,
+                      exe_type: str = 'insert') -> typing.List[int]:
+        """
+        执行单批插入
+        :param sql: 多行插入语句
+        :param table: 表名
+        :param print_sql: 是否打印sql语句
+        :param exe_type: 执行类型
+        :return: 本批新增数据的id列表
+        """
+        _info = self._execute(sql=sql, exe_type=exe_type, print_sql=print_sql, ret_info=True, table=table)
+        if not _info['lastrowid']:
+            return []
+        return list(range(_info['lastrowid'], _info['lastrowid'] + _info['rowcount']))
+
+    def _upsert_batch(self, sql: str, table: str, mode: str, row_num: int,
+                      print_sql: bool = False, exe_type: str = 'upsert') -> typing.Dict:
+        """
+        执行单批插入或更新 按执行信息 (Records / Duplicates) 及影响行数统计
+            ON DUPLICATE KEY UPDATE: 影响行数 新增计1 更新计2 未变化计0
+                Duplicates 只含值有变化的行 (未设置 CLIENT_FOUND_ROWS) 未变化数 = 行数 - 新增数 - 更新数
+            IGNORE: Duplicates 为忽略的行
+            REPLACE: 影响行数 新增计1 替换计2 (删除+插入) Duplicates 为替换的行
+        :param sql: 多行写入语句
+        :param table: 表名
+        :param mode: 写入模式 update / ignore / replace
+        :param row_num: 本批行数
+        :param print_sql: 是否打印sql语句
+        :param exe_type: 执行类型
+        :return: {'rows', 'affected', 'inserted', 'updated', 'unchanged'}
+        """
+        _info = self._execute(sql=sql, exe_type=exe_type, print_sql=print_sql, ret_info=True, table=table)
+        _affected = max(_info['rowcount'], 0)
+        _message = _info['message']
+        _match = _RECORDS_RE.search(_message.decode('utf-8', 'replace') if isinstance(_message, bytes) else _message)
+        if _match:
+            _duplicates = int(_match.group(2))
+        elif mode == 'ignore':
+            # 单行语句无执行信息 按影响行数推算
+            _duplicates = row_num - _affected
+        elif mode == 'update':
+            _duplicates = 1 if row_num == 1 and _affected == 2 else max(_affected - row_num, 0)
+        else:
+            _duplicates = max(_affected - row_num, 0)
+        ret_dict = {'rows': row_num, 'affected': _affected, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+        if mode == 'update':
+            ret_dict['updated'] = _duplicates
+            ret_dict['inserted'] = max(_affected - 2 * _duplicates, 0)
+            ret_dict['unchanged'] = max(row_num - ret_dict['inserted'] - _duplicates, 0)
+        elif mode == 'replace':
+            ret_dict['inserted'] = row_num - _duplicates
+            ret_dict['updated'] = _duplicates
+        else:
+            ret_dict['inserted'] = row_num - _duplicates
+            ret_dict['unchanged'] = _duplicates
+        return ret_dict
+
+    def _get_batch_bytes(self, max_packet: int = 0) -> int:
+        """
+        获取单批语句字节上限
+        :param max_packet: 指定上限 为0时读取服务端 max_allowed_packet
+        :return:
+        """
+        if not max_packet:
+            if not self.max_packet:
+                _results = self._execute(sql='SELECT @@max_allowed_packet AS max_allowed_packet')
+                self.max_packet = int(self._row_value(row=_results[0], key='max_allowed_packet'))
+            max_packet = self.max_packet
+        return max(max_packet - 1024, 1024)  # 预留包头空间
+
+    def load_data(self, table: str, rows: typing.Iterable[typing.Any], key_type_dict: typing.Optional[typing.Dict] = None,
+                  mode: str = '', chunk_rows: int = 100000, chunk_bytes: int = 64 * 1024 * 1024,
+                  warning_num: int = 10, print_sql: bool = False) -> typing.Dict:
+        """
+        批量导入 LOAD DATA LOCAL INFILE
+            数据逐行编码为制表符分隔文本写入临时文件 达到 chunk_rows 行或 chunk_bytes 字节时导入一次并清空
+            内存占用与数据总量无关 使用独立连接 (local_infile) 每块导入后提交 不参与事务及分组提交
+            需服务端开启 local_infile
+        :param table: 表名
+        :param rows: 数据迭代器 字典 或 按字段顺序的元组/列表 缺失字段按 None 处理
+        :param key_type_dict: 导入的字段及类型 (决定字段顺序) 默认按表结构缓存获取
+            数据按字段转换方法转换 结果为 None 时写入 NULL (\\N)
+        :param mode: 重复数据处理 '' 默认 / replace 替换 / ignore 忽略
+        :param chunk_rows: 每块最大行数
+        :param chunk_bytes: 每块最大字节数
+        :param warning_num: 最多读取的警告信息条数 (SHOW WARNINGS)
+        :param print_sql: 是否打印sql语句
+        :return: {'rows': 数据行数, 'loaded': 导入行数, 'skipped': 跳过行数, 'warnings': 警告数, 'chunks': 块数,
+            'seconds': 耗时, 'rows_per_second': 每秒行数, 'warning_list': [(级别, 代码, 信息)]}
+        """
+        if mode not in ('', 'replace', 'ignore'):
+            raise Exception(f"参数mode错误，仅支持选项：'', replace, ignore")
+        _converter_list = self._get_converter_list(table=table, key_type_dict=key_type_dict)
+        _encoding = pymysql.charset.charset_by_name(self.charset).encoding
+        _sql = f"LOAD DATA LOCAL INFILE %s {mode.upper()} INTO TABLE {self._name_str(d=table)} " \
+               f"CHARACTER SET {self.charset} FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' " \
+               f"LINES TERMINATED BY '\\n' ({', '.join([f'`{_k}`' for _k, _ in _converter_list])})"
+        ret_dict = {'rows': 0, 'loaded': 0, 'skipped': 0, 'warnings': 0, 'chunks': 0, 'seconds': 0.0,
+                    'rows_per_second': 0.0, 'warning_list': []}
+        _start = time.perf_counter()
+        _conn = self._new_conn(cursor_str='tuple', local_infile=True)
+        _fd, _path = tempfile.mkstemp(prefix='load_data_', suffix='.tsv')
+        try:
+            _cursor = _conn.cursor()
+            with os.fdopen(_fd, 'wb') as _file:
+                _num, _bytes = 0, 0  # 当前块行数 字节数
+                for _row in rows:
+                    _line = self._get_tsv_line(row=_row, converter_list=_converter_list, encoding=_encoding)
+                    _file.write(_line)
+                    _num += 1
+                    _bytes += len(_line)
+                    if _num >= chunk_rows or _bytes >= chunk_bytes:
+                        self._load_chunk(conn=_conn, cursor=_cursor, file=_file, sql=_sql, path=_path, table=table,
+                                         num=_num, ret_dict=ret_dict, warning_num=warning_num, print_sql=print_sql)
+                        _num, _bytes = 0, 0
+                if _num:
+                    self._load_chunk(conn=_conn, cursor=_cursor, file=_file, sql=_sql, path=_path, table=table,
+                                     num=_num, ret_dict=ret_dict, warning_num=warning_num, print_sql=print_sql)
+            _cursor.close()
+        finally:
+            _conn.close()
+            os.remove(_path)
+        ret_dict['seconds'] = time.perf_counter() - _start
+        ret_dict['rows_per_second'] = ret_dict['rows'] / ret_dict['seconds'] if ret_dict['seconds'] else 0.0
+        logger.info(f"导入完毕：{ret_dict['rows']} 行 导入：{ret_dict['loaded']} 行 耗时：{ret_dict['seconds']:.3f} 秒 "
+                    f"速度：{ret_dict['rows_per_second']:.0f} 行/秒 警告：{ret_dict['warnings']}")
+        return ret_dict
+
+    def _load_chunk(self, conn: pymysql.Connection, cursor: typing.Any, file: typing.BinaryIO, sql: str, path: str,
+                    table: str, num: int, ret_dict: typing.Dict, warning_num: int = 10,
+                    print_sql: bool = False) -> None:
+        """
+        导入一块临时文件数据 提交后清空文件 统计写入 ret_dict
+        :param conn: 独立连接
+        :param cursor: 游标
+        :param file: 临时文件
+        :param sql: LOAD DATA 语句
+        :param path: 临时文件路径
+        :param table: 表名
+        :param num: 本块行数
+        :param ret_dict: 统计字典
+        :param warning_num: 最多读取的警告信息条数
+        :param print_sql: 是否打印sql语句
+        :return:
+        """
+        file.flush()
+        if print_sql:
+            self._print_sql(sql=cursor.mogrify(sql, (path,)))
+        _start = time.perf_counter()
+        try:
+            _loaded = cursor.execute(query=sql, args=(path,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"导入失败 异常回滚数据")
+            raise e
+        finally:
+            self._invalidate(sql=sql, exe_type='load', table=table)
+        _seconds = time.perf_counter() - _start
+        self.query_stats.record(kind='load', table=self._stats_table(sql=sql, table=table), seconds=_seconds,
+                                rows=max(_loaded, 0))
+        _result = getattr(cursor, '_result', None)
+        _message = getattr(_result, 'message', None) or b''
+        _match = _SKIPPED_RE.search(_message.decode('utf-8', 'replace') if isinstance(_message, bytes) else _message)
+        _warnings = getattr(_result, 'warning_count', 0) or 0
+        if _warnings and len(ret_dict['warning_list']) < warning_num:
+            cursor.execute(query='SHOW WARNINGS LIMIT %s', args=(warning_num - len(ret_dict['warning_list']),))
+            ret_dict['warning_list'].extend(tuple(_r) for _r in cursor.fetchall())
+        with self._lock:
+            self.count_dict['insert'] += max(_loaded, 0)
+        ret_dict['rows'] += num
+        ret_dict['loaded'] += max(_loaded, 0)
+        ret_dict['skipped'] += int(_match.group(1)) if _match else 0
+        ret_dict['warnings'] += _warnings
+        ret_dict['chunks'] += 1
+        logger.info(f"导入数据：{num} 行 导入：{_loaded} 行 耗时：{_seconds:.3f} 秒 "
+                    f"速度：{num / _seconds if _seconds else 0:.0f} 行/秒 警告：{_warnings}")
+        # 清空临时文件 复用于下一块
+        file.seek(0)
+        file.truncate()
+
+    @staticmethod
+    def _get_tsv_line(row: typing.Any, converter_list: typing.List, encoding: str = 'utf-8') -> bytes:
+        """
+        获取单行 LOAD DATA 数据 制表符分隔 换行结尾 None 为 \\N 反斜杠/制表符/换行/回车/空字符转义
+            bytes 值 (BLOB / VARBINARY) 按原始字节转义写入 不解码
+        :param row: 数据字典 或 按字段顺序的元组/列表
+        :param converter_list: 字段转换方法列表 [(字段, 转换方法)]
+        :param encoding: 文本编码 (与连接字符集一致)
+        :return:
+        """
+        if isinstance(row, dict):
+            _value_list = [_convert(row.get(_key)) for _key, _convert in converter_list]
+        else:
+            _value_list = [_convert(_value) for (_, _convert), _value in zip(converter_list, row)]
+            _value_list += [_convert(None) for _, _convert in converter_list[len(_value_list):]]
+        _bytes_list = []
+        for _value in _value_list:
+            if _value is None:
+                _bytes_list.append(b'\\N')
+            elif isinstance(_value, bool):
+                _bytes_list.append(b'1' if _value else b'0')
+            elif isinstance(_value, (bytes, bytearray)):
+                _bytes_list.append(_TSV_BYTES_ESCAPE_RE.sub(lambda _m: _TSV_BYTES_ESCAPE_DICT[_m.group()], _value))
+            else:
+                _bytes_list.append(str(_value).translate(_TSV_ESCAPE_TABLE).encode(encoding))
+        return b'\t'.join(_bytes_list) + b'\n'
+
     def delete(self, delete_dict: typing.Dict, print_sql: bool = False) -> int:
         """
         更新方法
@@ -180,19 +845,20 @@ class MySqlDBClass(object):
         :param print_sql: 是否打印sql语句
         :return:
         """
-        _results_select = self.select(select_dict=copy.deepcopy(delete_dict), print_sql=print_sql)
+        # 仅读取首行判断是否存在
+        _results_select = next(self._select_pages(select_dict={**delete_dict, 'step': 1}, print_sql=print_sql), None)
         _results = 0  # 默认返回值
-        if len(_results_select) > 0:
+        if _results_select:
             # 获取修改语句
             _sql = self.get_delete(**delete_dict)
             # 执行语句
-            _results = self._cache_execute(sql=_sql, print_sql=print_sql, exe_type='delete')
-            print(f"删除条数：{_results}")
+            _results = self._cache_execute(sql=_sql, print_sql=print_sql, exe_type='delete', table=delete_dict['table'])
+            logger.info(f"删除条数：{_results}")
         else:
-            print(f"数据不存在 {delete_dict}")
+            logger.info(f"数据不存在 {delete_dict}")
         return _results  # 返回
 
-    def update(self, update_dict: typing.Dict, print_sql: bool = False) -> int:
+    def update(self, update_dict: typing.Dict, print_sql: bool = False, check_exist: bool = True) -> int:
         """
         更新方法
         :param update_dict: 更新参数字典
@@ -203,25 +869,179 @@ class MySqlDBClass(object):
                 'update_key_dict': '',
             }
         :param print_sql: 是否打印sql语句
+        :param check_exist: 是否先查询数据是否存在 为False时直接执行修改语句
         :return:
         """
         _select_dict = {
             'table': update_dict['table'],
             'condition': update_dict['condition'],
+            'step': 1,
         }
-        _results_select = self.select(select_dict=_select_dict, print_sql=print_sql)
+        # 仅读取首行判断是否存在
+        _results_select = next(self._select_pages(select_dict=_select_dict, print_sql=print_sql), None) \
+            if check_exist else True
         _results = 0  # 默认返回值
-        if len(_results_select) > 0:
+        if _results_select:
             # 获取修改语句
-            _sql = self.get_update(**update_dict)
+            _sql, _args = self.get_update_args(**update_dict)
             # 执行语句
-            _results = self._cache_execute(sql=_sql, print_sql=print_sql, exe_type='update')
-            print(f"修改条数：{_results}")
+            _results = self._cache_execute(sql=_sql, args=_args, print_sql=print_sql, exe_type='update',
+                                           table=update_dict['table'])
+            logger.info(f"修改条数：{_results}")
         else:
-            print(f"数据不存在 {_select_dict}")
+            logger.info(f"数据不存在 {_select_dict}")
         return _results  # 返回
 
-    def select(self, select_dict: typing.Dict, print_sql: bool = False) -> typing.List:
+    def update_many(self, table: str, rows: typing.Iterable[typing.Dict], key_column: str = 'id',
+                    key_type_dict: typing.Optional[typing.Dict] = None, batch_size: int = 1000, max_packet: int = 0,
+                    check_exist: bool = False, method: str = 'case', ignore_case: bool = True,
+                    print_sql: bool = False) -> typing.List[int]:
+        """
+        批量修改方法 按键字段逐行修改不同数据
+            case: 每批一条 UPDATE t SET a = CASE key WHEN k1 THEN v1 ... ELSE a END WHERE key IN (k1, ...)
+                各行可只包含部分字段 缺失字段保持原值 同一批内重复键合并 (后者覆盖)
+            join: 数据分批写入临时表 一条 UPDATE t JOIN 临时表 修改 (适用于大量数据) 在同一事务及连接中执行
+                各行字段需与首行一致
+        :param table: 表名
+        :param rows: 数据字典迭代器 需包含 key_column
+        :param key_column: 键字段 (唯一索引)
+        :param key_type_dict: 字段及类型 默认按表结构缓存获取
+        :param batch_size: 每批最大行数
+        :param max_packet: 每批语句最大字节数 默认读取 max_allowed_packet
+        :param check_exist: case 方式下是否每批先查询存在的键 仅修改存在的数据 (每批一次查询)
+        :param method: 修改方式 case / join
+        :param ignore_case: check_exist 时字符串键是否忽略大小写对应 (与 _ci 排序规则一致)
+        :param print_sql: 是否打印sql语句
+        :return: 每批影响行数列表 (join 方式仅一个) 计入 count_dict['update']
+        """
+        if method not in ('case', 'join'):
+            raise Exception(f"参数method错误，仅支持选项：case, join")
+        _converter_list = self._get_converter_list(table=table, key_type_dict=key_type_dict)
+        _convert_key = dict(_converter_list).get(key_column, _to_str)
+        if method == 'join':
+            return [self._update_join(table=table, rows=rows, key_column=key_column, converter_list=_converter_list,
+                                      batch_size=batch_size, max_packet=max_packet, print_sql=print_sql)]
+        _max_bytes = self._get_batch_bytes(max_packet=max_packet)
+        _key_list = [_k for _k, _ in _converter_list if _k != key_column]  # 可修改字段 按字段顺序
+        ret_count_list = []  # 每批影响行数
+        _batch_dict = {}  # 当前批次 {键值字符串: {字段: 数据字符串}}
+        _batch_bytes = 0  # 当前批次语句字节数 (近似值)
+        for _row in rows:
+            _key_str = self._escape(data=_convert_key(_row[key_column]))
+            _value_dict = {_k: self._escape(data=_convert(_row[_k])) for _k, _convert in _converter_list
+                           if _k in _row and _k != key_column}
+            if not _value_dict:
+                continue
+            # 每个字段一条 WHEN 键 THEN 值 及 IN 列表中的键
+            _bytes = (len(_key_str.encode('utf-8')) + 12) * (len(_value_dict) + 1) + \
+                sum(len(_v.encode('utf-8')) for _v in _value_dict.values())
+            if _batch_dict and (len(_batch_dict) >= batch_size or _batch_bytes + _bytes > _max_bytes):
+                ret_count_list.append(self._update_batch(table=table, key_column=key_column, key_list=_key_list,
+                                                         batch_dict=_batch_dict, check_exist=check_exist,
+                                                         ignore_case=ignore_case, print_sql=print_sql))
+                _batch_dict, _batch_bytes = {}, 0
+            _batch_dict.setdefault(_key_str, {}).update(_value_dict)
+            _batch_bytes += _bytes
+        if _batch_dict:
+            ret_count_list.append(self._update_batch(table=table, key_column=key_column, key_list=_key_list,
+                                                     batch_dict=_batch_dict, check_exist=check_exist,
+                                                     ignore_case=ignore_case, print_sql=print_sql))
+        return ret_count_list
+
+    def _update_batch(self, table: str, key_column: str, key_list: typing.List[str], batch_dict: typing.Dict,
+                      check_exist: bool = False, ignore_case: bool = True, print_sql: bool = False) -> int:
+        """
+        执行单批 CASE 修改
+        :param table: 表名
+        :param key_column: 键字段
+        :param key_list: 可修改字段列表
+        :param batch_dict: {键值字符串: {字段: 数据字符串}}
+        :param check_exist: 是否先查询存在的键
+        :param ignore_case: 存在的键是否忽略大小写对应 ('ABC' 对应已有的 'abc')
+        :param print_sql: 是否打印sql语句
+        :return: 影响行数
+        """
+        if check_exist:
+            _select_dict = {
+                'table': table,
+                'item_key': f"`{key_column}`",
+                'condition': f"`{key_column}` IN ({', '.join(batch_dict)})",
+                'step': max(len(batch_dict), 1000),
+                'use_cache': False,
+            }
+            _exist_set = {self._escape(data=self._row_value(row=_r, key=key_column))
+                          for _r in self.select(select_dict=_select_dict, print_sql=print_sql)}
+            if ignore_case:
+                _exist_set = {_k.lower() for _k in _exist_set}
+            batch_dict = {_k: _v for _k, _v in batch_dict.items() if (_k.lower() if ignore_case else _k) in _exist_set}
+            if not batch_dict:
+                logger.info(f"数据不存在 {_select_dict['condition'][:200]}")
+                return 0
+        _set_list = []
+        for _key in key_list:
+            _when_list = [f"WHEN {_k} THEN {_v[_key]}" for _k, _v in batch_dict.items() if _key in _v]
+            if _when_list:
+                _set_list.append(f"`{_key}` = CASE `{key_column}` {' '.join(_when_list)} ELSE `{_key}` END")
+        _sql = f"UPDATE {self._name_str(d=table)} SET {', '.join(_set_list)} " \
+               f"WHERE `{key_column}` IN ({', '.join(batch_dict)})"
+        ret_count = self._execute(sql=_sql, exe_type='update', print_sql=print_sql, table=table)
+        logger.info(f"修改条数：{ret_count}")
+        return ret_count
+
+    def _update_join(self, table: str, rows: typing.Iterable[typing.Dict], key_column: str,
+                     converter_list: typing.List, batch_size: int = 1000, max_packet: int = 0,
+                     print_sql: bool = False) -> int:
+        """
+        临时表关联修改 创建临时表 (结构取自原表字段 键字段为主键) 分批写入 关联修改后删除
+            临时表仅在当前连接可见 在事务中执行 (连接池模式下绑定同一连接)
+        :param table: 表名
+        :param rows: 数据字典迭代器 各行字段需与首行一致
+        :param key_column: 键字段
+        :param converter_list: 字段转换方法列表 [(字段, 转换方法)]
+        :param batch_size: 每批写入临时表行数
+        :param max_packet: 每批语句最大字节数
+        :param print_sql: 是否打印sql语句
+        :return: 影响行数
+        """
+        rows = iter(rows)
+        _first = next(rows, None)
+        if _first is None:
+            return 0
+        _converter_dict = dict(converter_list)
+        _key_list = [_k for _k, _ in converter_list if _k in _first and _k != key_column]
+        if not _key_list:
+            return 0
+        _column_list = [key_column] + _key_list
+        _tmp_converter_list = [(_k, _converter_dict.get(_k, _to_str)) for _k in _column_list]
+
+        def _check(row: typing.Dict) -> typing.Dict:
+            _miss_list = [_k for _k in _column_list if _k not in row]
+            if _miss_list:
+                raise Exception(f"join方式各行字段需与首行一致，缺少字段：{', '.join(_miss_list)}")
+            return row
+
+        _tmp = '_update_many_tmp'
+        _table = self._name_str(d=table)
+        _column_str = ', '.join([f"`{_k}`" for _k in _column_list])
+        _set_str = ', '.join([f"`_t`.`{_k}` = `_s`.`{_k}`" for _k in _key_list])
+        with self.transaction():
+            self._execute(sql=f"DROP TEMPORARY TABLE IF EXISTS `{_tmp}`", exe_type='ddl', print_sql=print_sql,
+                          table=_tmp)
+            self._execute(sql=f"CREATE TEMPORARY TABLE `{_tmp}` (PRIMARY KEY (`{key_column}`)) "
+                              f"SELECT {_column_str} FROM {_table} LIMIT 0",
+                          exe_type='ddl', print_sql=print_sql, table=_tmp)
+            # 重复键以后者为准 临时表写入不计入 upsert 数量统计
+            self._insert_rows(table=_tmp, rows=map(_check, itertools.chain([_first], rows)),
+                              converter_list=_tmp_converter_list, batch_size=batch_size, max_packet=max_packet,
+                              print_sql=print_sql, mode='replace', exe_type='stage')
+            ret_count = self._execute(sql=f"UPDATE {_table} AS `_t` JOIN `{_tmp}` AS `_s` "
+                                          f"ON `_t`.`{key_column}` = `_s`.`{key_column}` SET {_set_str}",
+                                      exe_type='update', print_sql=print_sql, table=table)
+            self._execute(sql=f"DROP TEMPORARY TABLE `{_tmp}`", exe_type='ddl', print_sql=print_sql, table=_tmp)
+        logger.info(f"修改条数：{ret_count}")
+        return ret_count
+
+    def select(self, select_dict: typing.Dict, print_sql: bool = False, row_type: str = 'dict') -> typing.List:
         """
         查询方法
         :param select_dict: 查询参数字典
@@ -231,34 +1051,170 @@ class MySqlDBClass(object):
                 'condition': '',
                 'start': 0, # 默认值
                 'step': 1000,  # 默认值
+                'order_by': '',  # 排序 可选
+                'seek_key': 'id',  # 可选 按有序索引字段分页 (WHERE id > 上页末值) 支持元组复合键
+                'seek_value': None,  # 可选 seek_key 分页起始值 (不含)
+                'use_cache': True,  # 可选 是否使用结果缓存
+                'cache_ttl': None,  # 可选 本次结果缓存过期时间 秒
+                'args': None,  # 可选 condition 中 %s 占位符的参数 (由驱动转义)
             }
         :param print_sql: 是否打印sql语句
+        :param row_type: 行类型
+            dict: 字典 None 转为 ''
+            row: 紧凑行 Row 元组游标读取 同一结果集共用字段名索引 读取时 None 转为 ''
         :return:
         """
-        _start, _step = self._get_start_step(select_dict=select_dict)
-        select_dict['step'] = _step  # 回填步长
+        if self._check_row_type(row_type=row_type) == 'row':
+            return list(self._select_rows(select_dict=select_dict, print_sql=print_sql))
         ret_data_list = []  # 返回的数据列表
-        while True:
-            select_dict['start'] = _start  # 更新开始行
-            # 获取查询语句
-            _sql = self.get_select(**select_dict)
-            # 执行语句
-            _results = self._cache_execute(sql=_sql, print_sql=print_sql)
+        for _results in self._select_pages(select_dict=select_dict, print_sql=print_sql):
             # 遍历数据
             for _result in _results:
                 ret_data_list.append(self._data_dict_cleaning(data_dict=_result))
-            # 如果没有结果 终止
-            if not _results or len(_results) < _step:
-                break
-            else:
-                _start += _step
 
         return ret_data_list  # 返回
 
-    def select_yield(self, select_dict: typing.Dict, print_sql: bool = False, is_debug=False) -> typing.Generator:
+    def _select_rows(self, select_dict: typing.Dict, print_sql: bool = False,
+                     count: typing.Optional[int] = None) -> typing.Generator[Row, None, None]:
+        """
+        分页查询 逐行返回紧凑行 Row
+        :param select_dict: 查询参数字典
+        :param print_sql: 是否打印sql语句
+        :param count: 偏移分页时的数据总数
+        :return:
+        """
+        _index = None  # 字段名索引 各页共用
+        for _info in self._select_pages(select_dict=select_dict, print_sql=print_sql, count=count,
+                                        cursor_str='tuple', ret_info=True):
+            if _index is None:
+                _index = Row.make_index(description=_info['description'])
+            for _values in _info['results']:
+                yield Row(_index, _values)
+
+    def _check_row_type(self, row_type: str) -> str:
+        """
+        校验行类型参数
+        :param row_type: 行类型 dict / row
+        :return:
+        """
+        if row_type not in ('dict', 'row'):
+            raise Exception(f"参数row_type错误，仅支持选项：dict, row")
+        return row_type
+
+    def select_columns(self, select_dict: typing.Dict, null_mode: str = 'none', fill_value: typing.Any = None,
+                       use_numpy: bool = True, print_sql: bool = False) -> typing.Any:
+        """
+        列式查询 按页读取元组结果 逐页追加到各字段列 不创建行字典
+            整数/浮点列使用 array.array 存储 其他列为 list
+            安装 numpy 且 use_numpy 时 数值列转为 int64/float64 数组 (不复制) 其他列为 object 数组
+        :param select_dict: 查询参数字典 同 select (默认不使用结果缓存)
+        :param null_mode: NULL 处理方式
+            none: 保留 None (含 None 的列为 list / object 数组)
+            fill: None 替换为 fill_value
+            mask: None 替换为 fill_value 并返回 NULL 掩码
+        :param fill_value: NULL 替换值 可为 {字段名: 值} 默认数值列为0 其他列为空字符串
+        :param use_numpy: 是否转为 numpy 数组 (未安装 numpy 时忽略)
+        :param print_sql: 是否打印sql语句
+        :return: {字段名: 列} mask 模式返回 ({字段名: 列}, {字段名: 掩码}) 掩码1为NULL (bytearray / bool 数组)
+        """
+        if null_mode not in ('none', 'fill', 'mask'):
+            raise Exception(f"参数null_mode错误，仅支持选项：none, fill, mask")
+        _name_list, _column_list, _mask_list = [], [], []
+        for _info in self._select_pages(select_dict={'use_cache': False, **select_dict}, print_sql=print_sql,
+                                        cursor_str='tuple', ret_info=True):
+            if not _name_list:
+                _name_list = [_d[0] for _d in _info['description']]
+                _column_list = [None] * len(_name_list)
+                _mask_list = [bytearray() for _ in _name_list]
+            # 按列转置本页
+            for _i, _values in enumerate(zip(*_info['results'])):
+                if null_mode != 'none':
+                    _mask = bytearray(_v is None for _v in _values)
+                    if any(_mask):
+                        _fill = fill_value.get(_name_list[_i]) if isinstance(fill_value, dict) else fill_value
+                        if _fill is None:
+                            _fill = self._column_default(column=_column_list[_i], values=_values)
+                        _values = [_fill if _v is None else _v for _v in _values]
+                    if null_mode == 'mask':
+                        _mask_list[_i] += _mask
+                _column_list[_i] = self._column_extend(column=_column_list[_i], values=_values)
+        _numpy = numpy if use_numpy else None
+        ret_column_dict, ret_mask_dict = {}, {}
+        for _name, _column, _mask in zip(_name_list, _column_list, _mask_list):
+            if _numpy is not None:
+                _column = _numpy.frombuffer(_column, dtype=_TYPECODE_DICT[_column.typecode]) \
+                    if isinstance(_column, array.array) else _numpy.array(_column, dtype=object)
+                _mask = _numpy.frombuffer(_mask, dtype=bool)
+            ret_column_dict[_name] = _column
+            ret_mask_dict[_name] = _mask
+        if null_mode == 'mask':
+            return ret_column_dict, ret_mask_dict
+        return ret_column_dict
+
+    @staticmethod
+    def _column_extend(column: typing.Any, values: typing.Sequence) -> typing.Any:
+        """
+        列追加一页数据
+            首页全为整数/浮点时创建 array.array 后续出现其他类型时转为 list
+        :param column: 已有列 首页为 None
+        :param values: 本页该列数据
+        :return:
+        """
+        if column is None:
+            _typecode = ''
+            if values and all(type(_v) is int for _v in values):
+                _typecode = 'q'
+            elif values and all(type(_v) is float for _v in values):
+                _typecode = 'd'
+            column = array.array(_typecode) if _typecode else []
+        if isinstance(column, array.array):
+            _num = len(column)
+            try:
+                column.extend(values)
+                return column
+            except (TypeError, OverflowError):
+                del column[_num:]  # 回退本页已追加部分
+                column = column.tolist()
+        column.extend(values)
+        return column
+
+    @staticmethod
+    def _column_default(column: typing.Any, values: typing.Sequence) -> typing.Any:
+        """
+        获取列的默认 NULL 替换值 数值列为0 其他列为空字符串
+        :param column: 已有列
+        :param values: 本页该列数据
+        :return:
+        """
+        if isinstance(column, array.array):
+            return 0 if column.typecode == 'q' else 0.0
+        for _value in values if column is None or not column else column[:1]:
+            if _value is not None:
+                if type(_value) is int:
+                    return 0
+                if type(_value) is float:
+                    return 0.0
+                return ''
+        return ''
+
+    def select_yield(self, select_dict: typing.Dict, print_sql: bool = False, is_debug=False,
+                     stream: bool = False, fetch_num: int = 1000, row_type: str = 'dict',
+                     count_mode: str = 'exact', progress: typing.Optional[typing.Callable[[typing.Dict], None]] = None,
+                     progress_seconds: float = 1.0) -> typing.Generator:
         """
         查询方法
         :param is_debug: 是否调试
+        :param stream: 是否使用服务端游标流式查询 (见 select_stream)
+        :param fetch_num: 流式查询每次读取行数
+        :param row_type: 行类型 dict / row 见 select
+        :param count_mode: 数据总数统计方式
+            exact: 偏移分页时先执行 COUNT(*) (到达总数即终止) 定位分页 / 流式查询仅在有 progress 时统计
+            estimate: 不执行 COUNT(*) 立即开始读取 progress 使用估算总数 (见 select_count)
+            none: 不统计总数 progress 中总数为None
+        :param progress: 进度回调 每页读取后调用 (间隔不小于 progress_seconds 结束时必定调用) 参数
+            {'rows': 已读行数, 'total': 总数, 'percent': 百分比, 'seconds': 耗时, 'rows_per_second': 每秒行数,
+             'eta': 预计剩余秒数, 'done': 是否结束} 总数未知时 total / percent / eta 为None
+        :param progress_seconds: 进度回调最小间隔 秒
         :param select_dict: 查询参数字典
             {
                 'table': r'dd_college_specials',  # 表名
@@ -266,89 +1222,746 @@ class MySqlDBClass(object):
                 'condition': '',
                 'start': 0, # 默认值
                 'step': 1000,  # 默认值
+                'seek_key': 'id',  # 可选 按有序索引字段分页 无需预先查询总数
             }
         :param print_sql: 是否打印sql语句
         :return:
         """
-        _start, _step = self._get_start_step(select_dict=select_dict)
+        _is_row = self._check_row_type(row_type=row_type) == 'row'
+        if count_mode not in ('exact', 'estimate', 'none'):
+            raise Exception(f"参数count_mode错误，仅支持选项：exact, estimate, none")
+        if stream and not is_debug and progress is None:
+            yield from self.select_stream(select_dict=select_dict, print_sql=print_sql, fetch_num=fetch_num,
+                                          row_type=row_type)
+            return
+        _count = None  # 分页的数据总数 到达即终止
+        _total = None  # 进度显示的数据总数
         if is_debug:
-            print(f"数据获取调试")
-            _step = _count = 1
+            logger.debug(f"数据获取调试")
+            select_dict['step'] = _count = _total = 1
+        elif count_mode == 'exact' and not stream and not select_dict.get('seek_key'):
+            _count = _total = self.select_count(select_dict=select_dict, print_sql=print_sql)  # 数据总数
+        elif count_mode != 'none' and progress is not None:
+            _total = self.select_count(select_dict=select_dict, print_sql=print_sql, mode=count_mode)
+        if stream and not is_debug:
+            _page_iter = self._stream_pages(select_dict=select_dict, print_sql=print_sql, fetch_num=fetch_num,
+                                            cursor_str='dict_ss' if self.cursor_str.startswith('dict') and not _is_row
+                                            else 'tuple_ss')
         else:
-            _count = self.select_count(select_dict=select_dict, print_sql=print_sql)  # 数据总数
-        select_dict['step'] = _step  # 回填步长
-        while _start < _count:
-            select_dict['start'] = _start  # 更新开始行
-            # 获取查询语句
-            _sql = self.get_select(**select_dict)
-            # 执行语句
-            _results = self._cache_execute(sql=_sql, print_sql=print_sql)
-            # 遍历数据
-            for _result in _results:
-                yield self._data_dict_cleaning(data_dict=_result)
-            _start += _step  # 更新分页开始行
-        print(f"数据获取完毕")
+            _page_iter = self._select_pages(select_dict=select_dict, print_sql=print_sql, count=_count,
+                                            cursor_str='tuple' if _is_row else '', ret_info=_is_row)
+        _progress = {'rows': 0, 'total': _total, 'start': time.perf_counter(), 'last': 0.0}
+        _index = None  # 字段名索引 各页共用
+        for _page in _page_iter:
+            _results = _page['results'] if isinstance(_page, dict) else _page
+            if _is_row:
+                if _index is None:
+                    _index = Row.make_index(description=_page['description'])
+                for _values in _results:
+                    yield Row(_index, _values)
+            else:
+                # 遍历数据
+                for _result in _results:
+                    yield self._data_dict_cleaning(data_dict=_result)
+            if progress is not None:
+                _progress['rows'] += len(_results)
+                self._report_progress(progress=progress, progress_dict=_progress, interval=progress_seconds)
+        if progress is not None:
+            self._report_progress(progress=progress, progress_dict=_progress, interval=progress_seconds, done=True)
+        logger.debug(f"数据获取完毕")
+
+    @staticmethod
+    def _report_progress(progress: typing.Callable[[typing.Dict], None], progress_dict: typing.Dict,
+                         interval: float, done: bool = False) -> None:
+        """
+        调用进度回调 距上次调用不足 interval 秒时跳过 (结束时必定调用)
+        :param progress: 进度回调
+        :param progress_dict: 进度状态 {'rows', 'total', 'start', 'last'}
+        :param interval: 最小间隔 秒
+        :param done: 是否结束
+        :return:
+        """
+        _now = time.perf_counter()
+        if not done and _now - progress_dict['last'] < interval:
+            return
+        progress_dict['last'] = _now
+        _rows, _total = progress_dict['rows'], progress_dict['total']
+        _seconds = _now - progress_dict['start']
+        _speed = _rows / _seconds if _seconds else 0.0
+        ret_dict = {
+            'rows': _rows,
+            'total': _total,
+            'percent': None,
+            'seconds': _seconds,
+            'rows_per_second': _speed,
+            'eta': None,
+            'done': done,
+        }
+        if _total is not None:
+            # 估算总数可能小于实际行数
+            ret_dict['percent'] = 100.0 if done else min(_rows / _total * 100, 100.0) if _total else 0.0
+            ret_dict['eta'] = 0.0 if done else max(_total - _rows, 0) / _speed if _speed else None
+        progress(ret_dict)
+
+    def select_incremental(self, select_dict: typing.Dict, checkpoint: typing.Any, watermark: str = 'id',
+                           tie_key: str = '', checkpoint_name: str = '', lag_seconds: int = 0,
+                           row_type: str = 'dict', print_sql: bool = False) -> typing.Generator:
+        """
+        增量查询 只返回水位字段超过上次断点的数据
+            按 (watermark, tie_key) 定位分页 (WHERE watermark > 断点 ORDER BY watermark LIMIT step) 耗时与变化量相关
+            每页数据全部迭代后保存本页末行的水位值 提前终止时未迭代完的页下次重新返回 (至少一次)
+            时间水位 (如 updated_at) 同一时间的多行按 tie_key (如 id) 继续 不会遗漏或重复
+            未指定 tie_key 且水位字段不唯一时 默认使用单字段主键 (无单字段主键时抛出异常)
+        :param select_dict: 查询参数字典 (table / item_key / condition / args / step)
+            结果需包含水位字段 元组游标 (row_type='row') 时水位字段需为输出字段的前几列
+            首次执行 (无断点) 时 seek_value 为起始水位 (不含) 默认从头读取
+        :param checkpoint: 断点存储 (checkpoint.FileCheckpoint / TableCheckpoint)
+        :param watermark: 水位字段 单调递增 (自增 id / 更新时间) 需有索引 (与 tie_key 的联合索引)
+        :param tie_key: 水位相同时的排序字段 (唯一) 默认按表结构判断 见上
+        :param checkpoint_name: 断点名称 默认为 incremental:表名:水位字段[,tie_key]
+        :param lag_seconds: 时间水位只读取早于 (当前时间 - lag_seconds) 的数据 避免未提交事务的数据晚于水位出现
+        :param row_type: 行类型 dict / row 见 select
+        :param print_sql: 是否打印sql语句
+        :return:
+        """
+        _is_row = self._check_row_type(row_type=row_type) == 'row'
+        if not tie_key:
+            tie_key = self._get_tie_key(table=select_dict['table'], watermark=watermark)
+        _seek_tuple = (watermark, tie_key) if tie_key else (watermark,)
+        _name = checkpoint_name or f"incremental:{select_dict['table']}:{','.join(_seek_tuple)}"
+        _point = checkpoint.get(name=_name)
+        _condition = f"({select_dict.get('condition') or '1=1'})"  # 与水位条件组合 括号保持调用方条件的优先级
+        if lag_seconds:
+            # 上限在开始时确定 本次读取期间不变
+            _bound = self._execute(sql=f"SELECT NOW() - INTERVAL {int(lag_seconds)} SECOND AS `bound`",
+                                   print_sql=print_sql, cursor_str='tuple')[0][0]
+            _bound_str = self._escape(data=_bound)
+            if select_dict.get('args') is not None:
+                _bound_str = _bound_str.replace('%', '%%')  # 参数化语句中转义
+            _condition = self._and(c=[_condition, f"`{watermark}` <= {_bound_str}"])
+        _select_dict = {
+            **select_dict,
+            'condition': _condition,
+            'seek_key': _seek_tuple,
+            'seek_value': _point['value'] if _point else select_dict.get('seek_value'),
+            'use_cache': False,
+        }
+        _rows = (_point or {}).get('rows', 0)  # 累计行数
+        _index = None  # 字段名索引 各页共用
+        for _page in self._select_pages(select_dict=_select_dict, print_sql=print_sql,
+                                        cursor_str='tuple' if _is_row else '', ret_info=_is_row):
+            _results = _page['results'] if _is_row else _page
+            if _is_row:
+                if _index is None:
+                    _index = Row.make_index(description=_page['description'])
+                for _values in _results:
+                    yield Row(_index, _values)
+            else:
+                for _result in _results:
+                    yield self._data_dict_cleaning(data_dict=_result)
+            # 本页已全部迭代 保存断点
+            _last = _results[-1]
+            _value = tuple(self._row_value(row=_last, key=_k, index=_i) for _i, _k in enumerate(_seek_tuple))
+            _rows += len(_results)
+            checkpoint.set(name=_name, value={'value': _value if tie_key else _value[0], 'rows': _rows,
+                                              'time': time.time()})
+
+    def _get_tie_key(self, table: str, watermark: str) -> str:
+        """
+        获取增量查询水位相同时的排序字段
+            水位字段为单字段主键或唯一索引时无需排序字段 否则使用单字段主键
+        :param table: 表名
+        :param watermark: 水位字段
+        :return: 排序字段 无需时为空字符串
+        """
+        _column_list = self.get_schema(table=table)
+        _pri_list = [_c['name'] for _c in _column_list if _c['key'] == 'PRI']
+        if _pri_list == [watermark] or any(_c['name'] == watermark and _c['key'] == 'UNI' for _c in _column_list):
+            return ''
+        if len(_pri_list) == 1:
+            return _pri_list[0]
+        raise Exception(f"水位字段不唯一且表无单字段主键 需指定tie_key：表：{table} 水位字段：{watermark}")
+
+    def select_parallel(self, select_dict: typing.Dict, key: str = 'id', partition_num: int = 4,
+                        ordered: bool = False, queue_size: int = 4, callback: typing.Optional[typing.Callable] = None,
+                        print_sql: bool = False) -> typing.Generator:
+        """
+        并行分区查询
+            读取整型字段 key 的最小/最大值 按范围切分为 partition_num 个分区
+            每个分区在独立线程中按 key 定位分页读取 合并为一个迭代器返回
+            需使用连接池模式 (pool_max >= partition_num) 单连接模式下各分区串行执行
+        :param select_dict: 查询参数字典 (table / item_key / condition / step) 结果需包含 key 字段
+        :param key: 分区字段 整型有序索引字段
+        :param partition_num: 分区数
+        :param ordered: 是否按分区顺序返回 (分区内按key有序) 否则按到达顺序返回
+        :param queue_size: 每个分区缓冲的页数
+        :param callback: 分区进度回调 (在分区线程中调用) 参数为字典
+            {'partition': 分区序号, 'start': 开始值, 'end': 结束值(不含), 'rows': 已读行数,
+             'status': 'running' / 'done' / 'error', 'error': 异常}
+        :param print_sql: 是否打印sql语句
+        :return:
+        """
+        _condition = f"({select_dict.get('condition') or '1=1'})"  # 与分区条件组合 括号保持调用方条件的优先级
+        # 分区字段范围
+        _sql = self.get_select(table=select_dict['table'], item_key=f"MIN(`{key}`) AS `min`, MAX(`{key}`) AS `max`",
+                               condition=_condition, step=1)
+        _result = self._execute(sql=_sql, print_sql=print_sql, args=select_dict.get('args'))[0]
+        _min, _max = self._row_value(row=_result, key='min'), self._row_value(row=_result, key='max', index=1)
+        if _min is None:
+            return
+        _size = (int(_max) - int(_min)) // partition_num + 1
+        _range_list = [(_s, min(_s + _size, int(_max) + 1)) for _s in range(int(_min), int(_max) + 1, _size)]
+        if ordered:
+            _queue_list = [queue.Queue(maxsize=queue_size) for _ in _range_list]
+        else:
+            _queue_list = [queue.Queue(maxsize=queue_size * len(_range_list))] * len(_range_list)
+        _stop = threading.Event()  # 迭代提前终止
+        _error_list = []  # 失败分区
+
+        def _put(q: queue.Queue, item: typing.Tuple) -> bool:
+            while not _stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _scan(index: int, start: int, end: int) -> None:
+            _info = {'partition': index, 'start': start, 'end': end, 'rows': 0, 'status': 'running', 'error': None}
+            _select_dict = {
+                **select_dict,
+                'condition': self._and(c=[_condition, f"`{key}` >= {start}", f"`{key}` < {end}"]),
+                'seek_key': key,
+                'seek_value': None,
+                'use_cache': False,
+            }
+            try:
+                for _results in self._select_pages(select_dict=_select_dict, print_sql=print_sql):
+                    if not _put(_queue_list[index], ('rows', _results)):
+                        return
+                    _info['rows'] += len(_results)
+                    if callback:
+                        callback(dict(_info))
+                _info['status'] = 'done'
+            except Exception as e:
+                _info.update(status='error', error=e)
+                _error_list.append(_info)
+                logger.error(f"分区查询失败：分区：{index} 范围：{start}~{end} 异常：{e}")
+            finally:
+                if callback and _info['status'] != 'running':
+                    callback(dict(_info))
+                _put(_queue_list[index], ('end', index))
+
+        with ThreadPoolExecutor(max_workers=len(_range_list)) as _executor:
+            try:
+                for _index, (_start, _end) in enumerate(_range_list):
+                    _executor.submit(_scan, _index, _start, _end)
+                # 按分区顺序读取 或 共用队列按到达顺序读取
+                for _queue in (_queue_list if ordered else _queue_list[:1]):
+                    _end_num = 0
+                    while _end_num < (1 if ordered else len(_range_list)):
+                        _kind, _data = _queue.get()
+                        if _kind == 'end':
+                            _end_num += 1
+                            continue
+                        for _result in _data:
+                            yield self._data_dict_cleaning(data_dict=_result)
+            finally:
+                _stop.set()
+        if _error_list:
+            raise Exception(f"分区查询失败：{[(_e['partition'], _e['start'], _e['end']) for _e in _error_list]}")
+
+    def select_stream(self, select_dict: typing.Dict, print_sql: bool = False,
+                      fetch_num: int = 1000, row_type: str = 'dict') -> typing.Generator:
+        """
+        流式查询 单条语句不分页 独立连接上使用服务端游标 (SSCursor/SSDictCursor) 每次读取fetch_num行
+            内存占用只与fetch_num相关 不使用缓存 不占用实例连接
+        :param select_dict: 查询参数字典
+            {
+                'table': r'dd_college_specials',  # 表名
+                'item_key': r'`id` AS `大学专业ID`',  # 输出字段键
+                'condition': '',
+                'order_by': '',  # 可选
+            }
+        :param print_sql: 是否打印sql语句
+        :param fetch_num: 每次读取行数
+        :param row_type: 行类型 dict / row 见 select
+        :return:
+        """
+        _is_row = self._check_row_type(row_type=row_type) == 'row'
+        _index = None  # 字段名索引 各块共用
+        for _info in self._stream_pages(select_dict=select_dict, print_sql=print_sql, fetch_num=fetch_num,
+                                        cursor_str='dict_ss' if self.cursor_str.startswith('dict') and not _is_row
+                                        else 'tuple_ss'):
+            if _is_row and _index is None:
+                _index = Row.make_index(description=_info['description'])
+            for _result in _info['results']:
+                yield Row(_index, _result) if _is_row else self._data_dict_cleaning(data_dict=_result)
+
+    def _stream_pages(self, select_dict: typing.Dict, print_sql: bool = False, fetch_num: int = 1000,
+                      cursor_str: str = 'tuple_ss') -> typing.Generator[typing.Dict, None, None]:
+        """
+        流式查询 独立连接上使用服务端游标 每次读取fetch_num行
+        :param select_dict: 查询参数字典 见 select_stream
+        :param print_sql: 是否打印sql语句
+        :param fetch_num: 每次读取行数
+        :param cursor_str: 服务端游标类型 tuple_ss / dict_ss
+        :return: 逐块返回 {'results', 'description'}
+        """
+        _sql = self.get_select(table=select_dict['table'], item_key=select_dict.get('item_key', '*'),
+                               condition=select_dict.get('condition') or '1=1', step=None,
+                               order_by=select_dict.get('order_by', ''))
+        _conn = self._new_conn(cursor_str=cursor_str)
+        try:
+            _cursor = _conn.cursor()
+            if print_sql:
+                self._print_sql(sql=_cursor.mogrify(_sql, select_dict.get('args')))
+            _cursor.execute(query=_sql, args=select_dict.get('args'))
+            while True:
+                _results = _cursor.fetchmany(fetch_num)
+                if not _results:
+                    break
+                yield {'results': _results, 'description': _cursor.description}
+        finally:
+            _conn.close()  # 直接关闭连接 提前终止时无需读完剩余数据
+
+    def export(self, select_dict: typing.Dict, path: str, file_format: str = '',
+               compression: typing.Optional[str] = None, chunk_rows: int = 10000, stream: bool = False,
+               writer_num: int = 1, queue_size: int = 2, callback: typing.Optional[typing.Callable] = None,
+               print_sql: bool = False) -> typing.Dict:
+        """
+        分块导出查询结果到文件 (见 export.py)
+            元组游标逐块读取 每块在编码线程中编码 (及压缩) 写入线程按顺序写入 读取 / 编码 / 写入重叠
+            同时在内存中的块数不超过 queue_size + 2 NULL 保留 (csv 为空字符串 jsonl 为 null)
+        :param select_dict: 查询参数字典 见 select_yield (默认不使用缓存)
+            分页读取时每块为一页 seek_key 需为输出字段的前几列
+        :param path: 文件路径
+        :param file_format: 导出格式 csv / jsonl / parquet (需安装 pyarrow) 默认按文件后缀判断
+        :param compression: 压缩方式 默认按文件后缀判断 (.gz / .bz2 / .xz)
+            csv / jsonl: gzip / bz2 / xz (每块单独压缩后追加)
+            parquet: 压缩编码 默认 snappy
+        :param chunk_rows: 每块行数 (分页步长 / 流式读取行数)
+        :param stream: 是否使用服务端游标流式读取 (独立连接 单条语句)
+        :param writer_num: 编码线程数 为0时在当前线程中编码及写入
+        :param queue_size: 等待写入的块数上限
+        :param callback: 每块写入后回调 (在写入线程中调用) 参数 {'rows', 'chunks', 'bytes', 'seconds'}
+        :param print_sql: 是否打印sql语句
+        :return: {'path', 'format', 'rows', 'chunks', 'bytes', 'seconds', 'rows_per_second', 'bytes_per_second'}
+        """
+        _format, _compression = get_format(path=path, file_format=file_format, compression=compression)
+        if stream:
+            _page_iter = self._stream_pages(select_dict=select_dict, print_sql=print_sql, fetch_num=chunk_rows)
+        else:
+            _select_dict = {**select_dict, 'step': chunk_rows, 'use_cache': select_dict.get('use_cache', False)}
+            _page_iter = self._select_pages(select_dict=_select_dict, print_sql=print_sql, cursor_str='tuple',
+                                            ret_info=True)
+
+        def _empty_description() -> typing.Sequence:
+            # 无数据时 读取字段信息 写入只有文件头的文件
+            _sql = self.get_select(table=select_dict['table'], item_key=select_dict.get('item_key', '*'),
+                                   condition=select_dict.get('condition') or '1=1', step=0)
+            return self._execute(sql=_sql, print_sql=print_sql, ret_info=True, args=select_dict.get('args'),
+                                 cursor_str='tuple')['description']
+
+        _stats_dict = write_chunks(
+            chunks=((_info['description'], _info['results']) for _info in _page_iter),
+            writer_factory=lambda description: WRITER_DICT[_format](path=path, description=description,
+                                                                    compression=_compression),
+            writer_num=writer_num, queue_size=queue_size, callback=callback, empty_description=_empty_description)
+        logger.info(f"导出完毕：{path} 行数：{_stats_dict['rows']} 字节数：{_stats_dict['bytes']} "
+                    f"耗时：{_stats_dict['seconds']:.3f} 秒 速度：{_stats_dict['rows_per_second']:.0f} 行/秒")
+        return {'path': path, 'format': _format, **_stats_dict}
+
+    def copy_table(self, target: 'MySqlDBClass', select_dict: typing.Dict, table: str = '',
+                   column_dict: typing.Optional[typing.Dict[str, str]] = None,
+                   transform: typing.Optional[typing.Callable[[typing.Dict], typing.Optional[typing.Dict]]] = None,
+                   key_type_dict: typing.Optional[typing.Dict] = None, mode: str = 'update', batch_size: int = 1000,
+                   queue_size: int = 4, checkpoint: typing.Any = None, checkpoint_name: str = '',
+                   reset: bool = False, callback: typing.Optional[typing.Callable[[typing.Dict], None]] = None,
+                   print_sql: bool = False) -> typing.Dict:
+        """
+        表复制 从本实例读取 批量写入目标实例
+            读取线程按 seek_key 定位分页读取 经有界队列交给当前线程写入 读取与写入重叠
+            每批在目标实例的事务中写入 提交后保存断点 (本批末行的 seek_key 值) 中断后再次执行从断点继续
+        :param target: 目标实例 (可为本实例)
+        :param select_dict: 查询参数字典 (table / item_key / condition / args / seek_key / seek_value)
+            seek_key 默认为 id 结果需包含 seek_key 字段
+        :param table: 目标表名 默认与源表相同
+        :param column_dict: 字段映射 {源字段: 目标字段} 指定时只复制映射的字段
+        :param transform: 行转换方法 参数为源数据字典 (映射前 NULL 为 None) 返回新字典 返回None时跳过该行
+        :param key_type_dict: 目标表写入字段及类型 默认按目标表结构获取
+        :param mode: 写入方式 insert (insert_many) / update / ignore / replace (upsert_many 见其 mode 参数)
+            保存断点前中断时 最后一批会再次写入 insert 模式可能产生重复数据
+        :param batch_size: 每批行数 (读取分页步长)
+        :param queue_size: 读取缓冲的批数
+        :param checkpoint: 断点存储 (如 checkpoint.FileCheckpoint) 为None时不保存断点
+        :param checkpoint_name: 断点名称 默认为 copy:源表:目标表
+        :param reset: 是否清除断点重新复制
+        :param callback: 每批写入后回调 参数 {'rows', 'written', 'skipped', 'batches', 'seconds', 'checkpoint'}
+        :param print_sql: 是否打印sql语句
+        :return: {'rows': 读取行数, 'written': 写入行数, 'skipped': 跳过行数, 'batches': 批数, 'seconds': 耗时,
+            'rows_per_second': 每秒行数, 'checkpoint': 最后断点值}
+        """
+        if mode not in ('insert', 'update', 'ignore', 'replace'):
+            raise Exception(f"参数mode错误，仅支持选项：insert, update, ignore, replace")
+        _table = table or select_dict['table']
+        _seek_key = select_dict.get('seek_key') or 'id'
+        _seek_tuple = (_seek_key,) if isinstance(_seek_key, str) else tuple(_seek_key)
+        _name = checkpoint_name or f"copy:{select_dict['table']}:{_table}"
+        if checkpoint is not None and reset:
+            checkpoint.delete(name=_name)
+        _point = checkpoint.get(name=_name) if checkpoint is not None else None
+        _select_dict = {
+            **select_dict,
+            'seek_key': _seek_key,
+            'seek_value': _point['value'] if _point else select_dict.get('seek_value'),
+            'step': batch_size,
+            'use_cache': False,
+        }
+        if _point:
+            logger.info(f"从断点继续复制：{_name} 断点：{_point['value']}")
+        ret_dict = {'rows': 0, 'written': 0, 'skipped': 0, 'batches': 0, 'seconds': 0.0,
+                    'checkpoint': _select_dict['seek_value']}
+        _queue = queue.Queue(maxsize=max(queue_size, 1))
+        _stop = threading.Event()  # 写入结束或失败
+
+        def _put(item: typing.Tuple) -> bool:
+            while not _stop.is_set():
+                try:
+                    _queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _read() -> None:
+            try:
+                for _results in self._select_pages(select_dict=_select_dict, print_sql=print_sql, cursor_str='dict'):
+                    if not _put(('rows', _results)):
+                        return
+                _put(('end', None))
+            except Exception as e:
+                logger.error(f"复制读取失败：{select_dict['table']} 异常：{e}")
+                _put(('error', e))
+
+        _start = time.perf_counter()
+        _thread = threading.Thread(target=_read, name='copy-reader', daemon=True)
+        _thread.start()
+        try:
+            while True:
+                _kind, _data = _queue.get()
+                if _kind == 'end':
+                    break
+                if _kind == 'error':
+                    raise _data
+                _row_list = []
+                for _row in _data:
+                    if transform is not None:
+                        _row = transform(_row)
+                        if _row is None:
+                            ret_dict['skipped'] += 1
+                            continue
+                    if column_dict:
+                        _row = {_t: _row[_s] for _s, _t in column_dict.items() if _s in _row}
+                    _row_list.append(_row)
+                if _row_list:
+                    with target.transaction():
+                        if mode == 'insert':
+                            target.insert_many(table=_table, rows=_row_list, key_type_dict=key_type_dict,
+                                               batch_size=batch_size, print_sql=print_sql)
+                        else:
+                            target.upsert_many(table=_table, rows=_row_list, key_type_dict=key_type_dict, mode=mode,
+                                               batch_size=batch_size, print_sql=print_sql)
+                # 本批末行作为断点
+                _value = tuple(_data[-1][_k] for _k in _seek_tuple)
+                ret_dict['checkpoint'] = _value[0] if len(_value) == 1 else _value
+                ret_dict['rows'] += len(_data)
+                ret_dict['written'] += len(_row_list)
+                ret_dict['batches'] += 1
+                ret_dict['seconds'] = time.perf_counter() - _start
+                if checkpoint is not None:
+                    checkpoint.set(name=_name, value={'value': ret_dict['checkpoint'], 'time': time.time(),
+                                                      'rows': (_point or {}).get('rows', 0) + ret_dict['rows']})
+                if callback:
+                    callback(dict(ret_dict))
+        finally:
+            _stop.set()
+            _thread.join()
+        ret_dict['seconds'] = time.perf_counter() - _start
+        ret_dict['rows_per_second'] = ret_dict['rows'] / ret_dict['seconds'] if ret_dict['seconds'] else 0.0
+        logger.info(f"复制完毕：{select_dict['table']} -> {_table} 行数：{ret_dict['rows']} "
+                    f"耗时：{ret_dict['seconds']:.3f} 秒")
+        return ret_dict
 
-    def select_count(self, select_dict: typing.Dict, print_sql: bool = False) -> int:
+    def select_count(self, select_dict: typing.Dict, print_sql: bool = False, mode: str = 'exact') -> int:
         """
         获取数据总数
         :param select_dict: 查询参数字典
         :param print_sql: 是否打印sql语句
+        :param mode: 统计方式
+            exact: COUNT(*) 精确数量
+            estimate: 估算数量 无条件时读取 information_schema.TABLES.TABLE_ROWS 有条件时读取 EXPLAIN 的预估行数
+                (InnoDB 统计信息 误差可能较大 只用于进度显示等)
         :return:
         """
+        if mode not in ('exact', 'estimate'):
+            raise Exception(f"参数mode错误，仅支持选项：exact, estimate")
         _start, _step = self._get_start_step(select_dict=select_dict)
         select_dict['step'] = _step  # 回填步长
+        if mode == 'estimate':
+            return self._estimate_count(select_dict=select_dict, print_sql=print_sql)
         # 获取数据总长度
         _count_select_dict = {
             'item_key': 'COUNT(*) as count',
             'table': select_dict['table'],
             'condition': select_dict.get('condition', '1=1'),
-            'step': _step,
-            'start': _start,
+            'step': 1,
+            'start': 0,
         }
         # 获取语句
         _sql = self.get_select(**_count_select_dict)
         # 执行语句
-        _results = self._cache_execute(sql=_sql, print_sql=print_sql)
-        return _results[0]  # 数据总数
+        _results = self._cache_execute(sql=_sql, print_sql=print_sql, use_cache=select_dict.get('use_cache', True),
+                                       cache_ttl=select_dict.get('cache_ttl'), table=select_dict['table'],
+                                       args=select_dict.get('args'))
+        return int(self._row_value(row=_results[0], key='count'))  # 数据总数
+
+    def _estimate_count(self, select_dict: typing.Dict, print_sql: bool = False) -> int:
+        """
+        估算数据总数 不扫描数据
+            无条件的单表: information_schema.TABLES.TABLE_ROWS
+            其他 (有条件 / 多表 / 视图): EXPLAIN 预估行数 (首个查询各表 rows * filtered 之积)
+        :param select_dict: 查询参数字典
+        :param print_sql: 是否打印sql语句
+        :return:
+        """
+        _table = select_dict['table']
+        _condition = select_dict.get('condition') or '1=1'
+        _cache_dict = {
+            'print_sql': print_sql,
+            'use_cache': select_dict.get('use_cache', True),
+            'cache_ttl': select_dict.get('cache_ttl'),
+            'table': _table,
+            'cursor_str': 'dict',
+        }
+        if _condition.replace(' ', '') == '1=1' and re.fullmatch(r'[`\w]+(\.[`\w]+)?', _table.strip()):
+            _schema, _, _name = _table.strip().replace('`', '').rpartition('.')
+            _sql = (f"SELECT `TABLE_ROWS` AS `rows` FROM information_schema.TABLES "
+                    f"WHERE `TABLE_SCHEMA` = {'%s' if _schema else 'DATABASE()'} AND `TABLE_NAME` = %s")
+            _results = self._cache_execute(sql=_sql, args=[_schema, _name] if _schema else [_name], **_cache_dict)
+            if _results and _results[0]['rows'] is not None:
+                return int(_results[0]['rows'])
+        _sql = f"EXPLAIN {self.get_select(table=_table, condition=_condition, step=None)}"
+        _results = self._cache_execute(sql=_sql, args=select_dict.get('args'), **_cache_dict)
+        if not _results:
+            return 0
+        ret_count = 1.0
+        for _result in _results:
+            if _result.get('id') != _results[0].get('id'):
+                continue
+            ret_count *= float(_result.get('rows') or 0) * float(_result.get('filtered') or 100) / 100
+        return int(ret_count)
 
-    def select_by_dict(self, table: str, data_dict: typing.Dict, key_type_dict: typing.Dict,
+    def _select_pages(self, select_dict: typing.Dict, print_sql: bool = False,
+                      count: typing.Optional[int] = None, cursor_str: str = '',
+                      ret_info: bool = False) -> typing.Generator[typing.Any, None, None]:
+        """
+        分页查询 逐页返回原始结果
+            默认 LIMIT start, step 偏移分页
+            指定 seek_key 时按索引字段定位分页 WHERE key > 上页末值 ORDER BY key LIMIT step
+                结果需包含 seek_key 字段 (元组游标时 seek_key 需为输出字段的前几列)
+        :param select_dict: 查询参数字典
+        :param print_sql: 是否打印sql语句
+        :param count: 数据总数 到达即终止 (偏移分页按开始行 定位分页按已返回行数)
+        :param cursor_str: 本次查询游标类型 默认使用实例游标
+        :param ret_info: 是否逐页返回执行信息字典 {'results', 'rowcount', 'lastrowid', 'description'}
+        :return:
+        """
+        _start, _step = self._get_start_step(select_dict=select_dict)
+        select_dict['step'] = _step  # 回填步长
+        _page_dict = {
+            'table': select_dict['table'],
+            'item_key': select_dict.get('item_key', '*'),
+            'condition': select_dict.get('condition') or '1=1',
+            'step': _step,
+            'order_by': select_dict.get('order_by', ''),
+        }
+        _cache_dict = {
+            'use_cache': select_dict.get('use_cache', True),
+            'cache_ttl': select_dict.get('cache_ttl'),
+            'table': select_dict['table'],
+            'args': select_dict.get('args'),
+            'cursor_str': cursor_str,
+            'ret_info': ret_info,
+        }
+
+        _seek_key = select_dict.get('seek_key')
+        if not _seek_key:
+            while count is None or _start < count:
+                select_dict['start'] = _page_dict['start'] = _start  # 更新开始行
+                # 获取查询语句 执行语句
+                _page = self._cache_execute(sql=self.get_select(**_page_dict), print_sql=print_sql, **_cache_dict)
+                _results = _page['results'] if ret_info else _page
+                if _results:
+                    yield _page
+                # 如果没有结果 终止
+                if not _results or len(_results) < _step:
+                    break
+                _start += _step  # 更新分页开始行
+            return
+        _seek_key = (_seek_key,) if isinstance(_seek_key, str) else tuple(_seek_key)
+        _seek_value = select_dict.get('seek_value')
+        if _seek_value is not None and not isinstance(_seek_value, (tuple, list)):
+            _seek_value = (_seek_value,)
+        _page_dict['order_by'] = ', '.join([f"`{_k}`" for _k in _seek_key])
+        _page_dict['start'] = 0
+        _condition = f"({_page_dict['condition']})"  # 与定位条件组合 括号保持调用方条件的优先级 (如含小写 or)
+        _num = 0  # 已返回行数
+        while count is None or _num < count:
+            if _seek_value is not None:
+                _seek_condition = self._seek_condition(seek_key=_seek_key, seek_value=_seek_value)
+                if _cache_dict['args'] is not None:
+                    _seek_condition = _seek_condition.replace('%', '%%')  # 参数化语句中转义
+                _page_dict['condition'] = self._and(c=[_condition, _seek_condition])
+            _page = self._cache_execute(sql=self.get_select(**_page_dict), print_sql=print_sql, **_cache_dict)
+            _results = _page['results'] if ret_info else _page
+            if _results:
+                yield _page
+            if not _results or len(_results) < _step:
+                break
+            _num += len(_results)
+            # 本页末行作为下一页起点
+            _last = _results[-1]
+            _seek_value = tuple(_last[_k] for _k in _seek_key) if isinstance(_last, dict) else \
+                tuple(_last[:len(_seek_key)])
+
+    def _seek_condition(self, seek_key: typing.Tuple, seek_value: typing.Sequence) -> str:
+        """
+        获取定位分页条件 复合键展开为 a > x OR (a = x AND b > y)
+        :param seek_key: 有序字段元组
+        :param seek_value: 上页末行字段值
+        :return:
+        """
+        _or_list = []
+        for _i, _key in enumerate(seek_key):
+            _and_list = [f"`{_k}` = {self._escape(_v)}" for _k, _v in zip(seek_key[:_i], seek_value[:_i])]
+            _and_list.append(f"`{_key}` > {self._escape(seek_value[_i])}")
+            _or_list.append(' AND '.join(_and_list))
+        return self._or(c=_or_list)
+
+    def select_by_dict(self, table: str, data_dict: typing.Dict, key_type_dict: typing.Optional[typing.Dict] = None,
                        print_sql: bool = False) -> typing.List:
         """
         根据数据查询结果
         :param print_sql: 是否打印sql
         :param table: 表名
         :param data_dict: 数据字典
-        :param key_type_dict: 有效键-类型字典
+        :param key_type_dict: 有效键-类型字典 默认按表结构缓存获取
         :return:
         """
-        _item_key_value_list = []  # 字段键值对列表
+        _key_type_dict = key_type_dict if key_type_dict is not None else self.get_key_type_dict(table=table)
+        _key_list = []  # (字段, 运算符) 列表
+        _args = []  # 条件参数
         # 遍历有效键-类型字典 获取查询条件
-        for _key, _type in key_type_dict.items():
+        for _key, _convert in self._get_converter_list(table=table, key_type_dict=key_type_dict):
             if _key not in data_dict:
                 continue
-            _value = data_dict[_key]  # 数据
-            _value = self.item_data_2_str(data=_value, value_type=_type)  # 数据根据类型转字符串
-            # if re.match(r'str', _type):
-            if _type == str:
-                _key_value_str = f"`{_key}` LIKE {_value}"
-            elif _value == 'None' or _value is None:
-                _key_value_str = f""
-            else:
-                _key_value_str = f"`{_key}` = {_value}"
-            if _key_value_str:
-                _item_key_value_list.append(_key_value_str)  # 追加
-        # print(_item_key_value_list)
-        _condition = ' AND '.join(_item_key_value_list)  # 查询条件
-        # print(f"条件：{_condition}")  # 调试
-        # 获取查询语句
+            _value = _convert(data_dict[_key])  # 数据根据类型转换
+            _key_list.append((_key, 'IS' if _value is None else 'LIKE' if _key_type_dict[_key] == str else '='))
+            _args.append(_value)
+        # 无有效字段时条件为空 会查询全表 (insert 查重时误判为已存在)
+        if not _key_list:
+            raise Exception(f"查询条件为空：数据字典中没有有效字段 表：{table} 字段：{', '.join(data_dict) or '无'}")
+        # 获取查询语句 条件模板按 (表, 字段) 缓存
         _select_dict = {
             'table': table,
-            'condition': _condition,
+            'condition': self._get_template(kind='where', table=table, key_tuple=tuple(_key_list)),
+            'args': _args,
         }
         # 查询
         return self.select(_select_dict, print_sql=print_sql)
 
+    def select_by_dict_many(self, table: str, rows: typing.Iterable[typing.Dict],
+                            key_type_dict: typing.Optional[typing.Dict] = None, batch_size: int = 1000,
+                            item_key: str = '*', ignore_case: bool = True, row_type: str = 'dict',
+                            print_sql: bool = False) -> typing.List[typing.List]:
+        """
+        批量根据数据查询结果 (批量点查)
+            每批输入按使用的字段分组 每组一次查询 等值条件 `k` IN (...) / (`k1`, `k2`) IN ((...), (...)) 可使用索引
+            值为 None 的字段使用 IS NULL 条件 结果按查询字段值对应回每条输入
+        :param table: 表名
+        :param rows: 数据字典迭代器 与 select_by_dict 的 data_dict 相同 无有效字段的数据返回空列表
+        :param key_type_dict: 有效键-类型字典 默认按表结构缓存获取
+        :param batch_size: 每批输入数据条数
+        :param item_key: 输出字段 需包含查询字段
+        :param ignore_case: 字符串是否忽略大小写对应结果 (与 _ci 排序规则一致)
+        :param row_type: 行类型 dict / row 见 select
+        :param print_sql: 是否打印sql
+        :return: 与rows一一对应的结果列表 [[结果行]]
+        """
+        self._check_row_type(row_type=row_type)
+        _converter_list = self._get_converter_list(table=table, key_type_dict=key_type_dict)
+        _converter_dict = dict(_converter_list)
+        ret_list = []  # 每条输入的结果列表
+        for _chunk in self._chunk(data=rows, size=batch_size):
+            _offset = len(ret_list)
+            ret_list.extend([] for _ in _chunk)
+            # 按字段分组 {(IN 字段, IS NULL 字段): {对应值: [输入位置]}}
+            _group_dict = {}
+            for _index, _row in enumerate(_chunk):
+                _in_list, _null_list = [], []
+                for _key, _convert in _converter_list:
+                    if _key in _row:
+                        (_null_list if _convert(_row[_key]) is None else _in_list).append(_key)
+                if not _in_list and not _null_list:
+                    continue
+                _match = self._match_value(data_dict=_row, converter_dict=_converter_dict, key_tuple=tuple(_in_list),
+                                           ignore_case=ignore_case)
+                _group_dict.setdefault((tuple(_in_list), tuple(_null_list)), {}).setdefault(_match, []).append(
+                    (_offset + _index, _row))
+            for (_in_tuple, _null_tuple), _match_dict in _group_dict.items():
+                _condition_list = [f"`{_k}` IS NULL" for _k in _null_tuple]
+                _args = None
+                if _in_tuple:
+                    # 每个对应值取一条输入作为参数
+                    _value_list = [[_converter_dict[_k](_item_list[0][1][_k]) for _k in _in_tuple]
+                                   for _item_list in _match_dict.values()]
+                    _args = [_v for _value in _value_list for _v in _value]
+                    if len(_in_tuple) == 1:
+                        _condition_list.append(f"`{_in_tuple[0]}` IN ({', '.join(['%s'] * len(_value_list))})")
+                    else:
+                        _key_str = ', '.join([f"`{_k}`" for _k in _in_tuple])
+                        _row_str = ', '.join(['(' + ', '.join(['%s'] * len(_in_tuple)) + ')'] * len(_value_list))
+                        _condition_list.append(f"({_key_str}) IN ({_row_str})")
+                _select_dict = {
+                    'table': table,
+                    'item_key': item_key,
+                    'condition': self._and(c=_condition_list),
+                    'args': _args,
+                    'step': max(len(_match_dict), 1000),
+                    'use_cache': False,  # 每批条件不同 不缓存
+                }
+                for _result in self.select(select_dict=_select_dict, print_sql=print_sql, row_type=row_type):
+                    _match = self._match_value(data_dict=_result, converter_dict=_converter_dict, key_tuple=_in_tuple,
+                                               ignore_case=ignore_case)
+                    for _index, _ in _match_dict.get(_match, ()):
+                        ret_list[_index].append(_result)
+        return ret_list
+
+    def _match_value(self, data_dict: typing.Mapping, converter_dict: typing.Dict, key_tuple: typing.Tuple,
+                     ignore_case: bool = True) -> typing.Tuple[str, ...]:
+        """
+        获取批量点查的对应值 输入数据与结果行使用相同转换
+        :param data_dict: 输入数据 / 结果行
+        :param converter_dict: 字段转换方法字典
+        :param key_tuple: 对应字段
+        :param ignore_case: 是否忽略大小写
+        :return:
+        """
+        ret_value = self._unique_value(data_dict=data_dict, converter_dict=converter_dict, unique_tuple=key_tuple)
+        return tuple(_v.lower() for _v in ret_value) if ignore_case else ret_value
+
     def select_table_info(self, name: str, schema: str = '') -> typing.List:
         """
         获取表结构详细信息
@@ -397,7 +2010,7 @@ class MySqlDBClass(object):
         """
         # 数据库名称初始化
         if not schema:
-            schema = str(self.conn.db, encoding='utf-8')
+            schema = self._conn_kwargs['db']
         # 查询字典
         _sql_dict = {
             'table': r'information_schema.columns',  # 表名
@@ -419,7 +2032,7 @@ class MySqlDBClass(object):
         }
         return self.select(select_dict=_sql_dict, print_sql=True)
 
-    def desc_table(self, table, print_sql: bool = False) -> typing.List:
+    def desc_table(self, table, print_sql: bool = False, use_cache: bool = True) -> typing.List:
         """
         获取表结构
             Field:字段表示的是列名
@@ -430,12 +2043,104 @@ class MySqlDBClass(object):
             Extra :其它信息
         :param print_sql: 是否打印输出语句
         :param table: 表名
+        :param use_cache: 是否使用结果缓存
         :return:
         """
         # 查询语句
         _sql = f"DESC {self._name_str(d=table)}"
         # 执行
-        return self._cache_execute(sql=_sql, print_sql=print_sql)
+        return self._cache_execute(sql=_sql, print_sql=print_sql, use_cache=use_cache, table=table)
+
+    def get_schema(self, table: str, refresh: bool = False) -> typing.List[typing.Dict]:
+        """
+        获取表结构 (information_schema.columns) 按表缓存 过期或指定刷新时重新读取
+        :param table: 表名 可带库名 db.table
+        :param refresh: 是否强制刷新
+        :return: [{'name': 字段名, 'type': 数据类型, 'is_null': 是否可为NULL, 'key': 索引类型, 'extra': 其他信息}]
+        """
+        _item = self.schema_dict.get(table)
+        if _item and not refresh and (not self.schema_ttl or time.monotonic() - _item[0] < self.schema_ttl):
+            return _item[1]
+        _name_list = table.replace('`', '').split('.')
+        _schema, _name = (_name_list[0], _name_list[-1]) if len(_name_list) > 1 else (self._conn_kwargs['db'],
+                                                                                      _name_list[0])
+        _sql = self.get_select(
+            table=r'information_schema.columns',
+            item_key=self._item_str(item_dict={
+                'COLUMN_NAME': 'name',
+                'DATA_TYPE': 'type',
+                'IS_NULLABLE': 'is_null',
+                'COLUMN_KEY': 'key',
+                'EXTRA': 'extra',
+            }),
+            condition='`table_schema` = %s AND `table_name` = %s', step=None, order_by='`ORDINAL_POSITION`')
+        _results = self._execute(sql=_sql, args=[_schema, _name])
+        if not _results:
+            raise Exception(f"表不存在或无字段：{table}")
+        _column_list = [_r if isinstance(_r, dict) else dict(zip(('name', 'type', 'is_null', 'key', 'extra'), _r))
+                        for _r in _results]
+        # 按字段类型编译转换方法
+        _converter_dict = {}
+        for _column in _column_list:
+            _type = self._schema_type(data_type=_column['type'])
+            _convert = _CONVERTER_DICT.get(_type, _to_str)
+            _converter_dict[_column['name']] = _nullable(_convert) if _column['is_null'] == 'YES' else _convert
+        self.schema_dict[table] = (time.monotonic(), _column_list, _converter_dict)
+        return _column_list
+
+    def refresh_schema(self, table: str = '') -> None:
+        """
+        清除表结构缓存 下次使用时重新读取
+        :param table: 表名 为空时清除全部
+        :return:
+        """
+        if table:
+            self.schema_dict.pop(table, None)
+        else:
+            self.schema_dict.clear()
+
+    def get_key_type_dict(self, table: str) -> typing.Dict:
+        """
+        根据表结构获取字段-类型字典 (int / float / str)
+        :param table: 表名
+        :return:
+        """
+        return {_c['name']: self._schema_type(data_type=_c['type']) for _c in self.get_schema(table=table)}
+
+    def get_converter_dict(self, table: str) -> typing.Dict[str, typing.Callable]:
+        """
+        根据表结构获取字段转换方法字典 (可为NULL字段 None 保持为 None)
+        :param table: 表名
+        :return:
+        """
+        self.get_schema(table=table)
+        return self.schema_dict[table][2]
+
+    def _get_converter_list(self, table: str,
+                            key_type_dict: typing.Optional[typing.Dict] = None) -> typing.List[typing.Tuple]:
+        """
+        获取字段转换方法列表 每次调用编译一次 逐行转换时不再判断类型
+        :param table: 表名
+        :param key_type_dict: 字段-类型字典 为None时按表结构缓存获取
+        :return: [(字段, 转换方法)]
+        """
+        if key_type_dict is None:
+            return list(self.get_converter_dict(table=table).items())
+        return [(_k, _CONVERTER_DICT.get(_t, _to_str)) for _k, _t in key_type_dict.items()]
+
+    @staticmethod
+    def _schema_type(data_type: str) -> typing.Any:
+        """
+        表结构数据类型转字段类型
+        :param data_type: information_schema.columns.DATA_TYPE
+        :return: int / float / str
+        """
+        data_type = data_type.lower()
+        if data_type in _INT_TYPE_SET:
+            return int
+        elif data_type in _FLOAT_TYPE_SET:
+            return float
+        return str
 
     def _item_str(self, item_dict: typing.Dict = None, alias: str = '') -> str:
         """
@@ -509,6 +2214,14 @@ class MySqlDBClass(object):
         else:
             return f"'{data}'" if data else ''
 
+    def _escape(self, data: typing.Any) -> str:
+        """
+        数据转sql字面量 (pymysql转义)
+        :param data: 源数据
+        :return:
+        """
+        return pymysql.converters.escape_item(data, self.charset)
+
     @staticmethod
     def _and(c: typing.Collection) -> str:
         """
@@ -544,84 +2257,492 @@ class MySqlDBClass(object):
         :param value_type: 要转换的类型
         :return:
         """
-        _data = data  # 数据备份
-        # if re.match(r'int', value_type):  # 整型
-        if value_type == int:  # 整型
-            ret_str = f"{int(_data) if _data or _data == 0 else 0}"
-        elif float == value_type:  # 浮点型
-            ret_str = f"{float(_data) if _data or _data == 0 else 0.0}"
-        else:  # 字符串
-            if isinstance(_data, float):
-                _data = int(_data)  # 浮点型转整型
-            if not _data:
-                _data = ''  # 空类型转空字符串
-            ret_str = f"\"{_data}\""
-        return re.sub(r'None', r'null', ret_str)  # 返回
+        # 按类型转换后 使用pymysql转义 (引号 / 反斜杠等)
+        return pymysql.converters.escape_item(MySqlDBClass.convert_value(data=data, value_type=value_type), 'utf8')
+
+    @staticmethod
+    def convert_value(data: typing.Any, value_type: typing.Any) -> typing.Any:
+        """
+        根据数据类型转换数据 (参数化语句使用)
+            整型: 空值转0 浮点型: 空值转0.0 其他: 浮点转整型 空值转空字符串
+        :param data: 源数据
+        :param value_type: 要转换的类型
+        :return:
+        """
+        return _CONVERTER_DICT.get(value_type, _to_str)(data)
 
-    def _cache_execute(self, sql: str, cache_sql: str = '', exe_type: str = 'select',
-                       print_sql: bool = False) -> typing.Any:
+    def _cache_execute(self, sql: str, cache_sql: typing.Hashable = '', exe_type: str = 'select',
+                       print_sql: bool = False, use_cache: bool = True,
+                       cache_ttl: typing.Optional[float] = None, table: str = '',
+                       args: typing.Optional[typing.Sequence] = None, cursor_str: str = '',
+                       ret_info: bool = False) -> typing.Any:
         """
         缓存装饰器
+            缓存按涉及的表名打标签 写入该表时失效 (见 _invalidate)
+            并发的相同查询 (相同缓存键) 只执行一次 其他线程等待共用结果 (见 SingleFlight 不使用缓存时同样合并)
         :param sql: 要执行的查询语句
-        :param cache_sql: 缓存的查询语句
+        :param cache_sql: 缓存键 默认为语句及参数 (见 _cache_key)
         :param exe_type: 执行类型 insert delete update select
         :param print_sql: 是否打印语句
+        :param use_cache: 是否使用缓存 为False时直接执行且不写入缓存 (本线程事务中同样不使用缓存)
+        :param cache_ttl: 本条缓存过期时间 秒 默认使用缓存整体设置
+        :param table: 涉及的表 (get_select 的 table 参数 可含 JOIN)
+        :param args: 语句参数
+        :param cursor_str: 本次执行游标类型 默认使用实例游标
+        :param ret_info: 是否返回执行信息字典 见 _execute
         :return:
         """
-        _cache_sql = cache_sql if cache_sql else sql
-        # 判断是否存在查询缓存
-        if _cache_sql in self.cache_dict:
-            # print(f"使用缓存")
-            _results = self.cache_dict[_cache_sql]
-        else:
-            # print(f"追加缓存")
-            # 打印sql语句
-            _results = self._execute(sql=sql, exe_type=exe_type, print_sql=print_sql)
+        _execute_dict = {'exe_type': exe_type, 'print_sql': print_sql, 'table': table, 'args': args,
+                         'cursor_str': cursor_str, 'ret_info': ret_info}
+        _cache_sql = cache_sql if cache_sql else self._cache_key(sql=sql, args=args)
+        if cursor_str or ret_info:
+            _cache_sql = (cursor_str, ret_info, _cache_sql)  # 结果结构不同 分开缓存
+        # 并发的相同查询合并执行 (事务中读取需使用事务连接 不合并)
+        _in_transaction = getattr(self._local, 'depth', 0) > 0
+        _single_flight = self.single_flight if exe_type == 'select' and not _in_transaction else None
+        # 事务中读取可能含未提交数据 不读取也不写入共用缓存
+        if not use_cache or _in_transaction:
+            if _single_flight is not None:
+                return _single_flight.do(key=(False, _cache_sql), func=lambda: self._execute(sql=sql, **_execute_dict))
+            return self._execute(sql=sql, **_execute_dict)
+
+        def _load() -> typing.Any:
+            _name_list = self._table_name_list(table=table)
+            # 插入结果(已有id)仅在修改/删除时失效
+            _tags = [f"insert:{_n}" for _n in _name_list] if exe_type == 'insert' else _name_list
+            # 执行前读取失效代数 执行期间相关表有写入时 结果可能为写入前数据 不写入缓存
+            _generation = self._get_generation(tags=_tags)
+            ret_results = self._execute(sql=sql, **_execute_dict)
+            if self._get_generation(tags=_tags) != _generation:
+                return ret_results
             # 追加缓存
-            self.cache_dict[_cache_sql] = _results
+            if isinstance(self.cache_dict, LRUCache):
+                self.cache_dict.set(key=_cache_sql, value=ret_results, ttl=cache_ttl, tags=_tags)
+            else:
+                self.cache_dict[_cache_sql] = ret_results
+            return ret_results
+
+        # 判断是否存在查询缓存
+        _results = self.cache_dict.get(_cache_sql, _MISS)
+        self.query_stats.record_cache(hit=_results is not _MISS)
+        if _results is _MISS:
+            _results = _load() if _single_flight is None else _single_flight.do(key=(True, _cache_sql), func=_load)
         return _results
 
+    @staticmethod
+    def _cache_key(sql: str, args: typing.Optional[typing.Sequence] = None) -> typing.Hashable:
+        """
+        获取缓存键 无参数时为语句本身
+        :param sql: 语句
+        :param args: 语句参数
+        :return:
+        """
+        return (sql, tuple(args)) if args is not None else sql
+
+    def _invalidate(self, sql: str, exe_type: str, table: str = '') -> None:
+        """
+        写入语句执行后 失效该表相关缓存
+            插入: 失效该表查询缓存
+            修改/删除/其他: 同时失效该表插入结果缓存
+            无法识别表名时清空缓存
+        :param sql: 执行的语句
+        :param exe_type: 执行类型
+        :param table: 表名 为空时从语句中识别
+        :return:
+        """
+        if self.single_flight is not None:
+            self.single_flight.forget()  # 写入后的查询不再共用写入前开始的查询结果
+        _name_list = self._sql_table_list(sql=sql, table=table)
+        if not _name_list or not hasattr(self.cache_dict, 'invalidate'):
+            self._add_generation(tags=[''])
+            self.cache_dict.clear()
+            return
+        _tags = _name_list if exe_type == 'insert' else _name_list + [f"insert:{_n}" for _n in _name_list]
+        self._add_generation(tags=_tags)
+        for _tag in _tags:
+            self.cache_dict.invalidate(_tag)
+
+    def _get_generation(self, tags: typing.Iterable[str]) -> typing.Tuple[int, ...]:
+        """
+        获取标签的失效代数 (含清空全部)
+        :param tags: 缓存标签
+        :return: 代数元组
+        """
+        with self._generation_lock:
+            return tuple(self.generation_dict.get(_tag, 0) for _tag in itertools.chain([''], tags))
+
+    def _add_generation(self, tags: typing.Iterable[str]) -> None:
+        """
+        增加标签的失效代数 在失效缓存前调用
+        :param tags: 缓存标签 '' 为清空全部
+        :return:
+        """
+        with self._generation_lock:
+            for _tag in tags:
+                self.generation_dict[_tag] = self.generation_dict.get(_tag, 0) + 1
+
+    @staticmethod
+    def _table_name_list(table: str) -> typing.List[str]:
+        """
+        获取表参数中的表名 (去除库名及反引号 小写) 支持逗号及 JOIN
+        :param table: 表参数 如 `a` AS x LEFT JOIN db.b ON ...
+        :return:
+        """
+        if not table:
+            return []
+        _name_list = re.findall(r'(?:^|,|\bJOIN\b)\s*([`\w.]+)', table, flags=re.I)
+        return list(dict.fromkeys(_n.replace('`', '').split('.')[-1].lower() for _n in _name_list))
+
+    def execute_stats(self) -> typing.Dict:
+        """
+        执行统计 (见 QueryStats.stats)
+        :return: {'kind': {类型: 统计}, 'table': {表名: 统计}, 'cache': {'hit', 'miss', 'ratio'}, 'slow': [样本],
+            'count': 行数统计 count_dict, 'commit': 提交统计 commit_stats}
+        """
+        return {
+            **self.query_stats.stats(),
+            'count': dict(self.count_dict),
+            'commit': self.commit_stats(),
+        }
+
+    def add_hook(self, before: typing.Optional[typing.Callable[[typing.Dict], None]] = None,
+                 after: typing.Optional[typing.Callable[[typing.Dict], None]] = None) -> None:
+        """
+        添加执行钩子 (见 QueryStats.add_hook)
+        :param before: 执行前钩子 参数 {'kind', 'table', 'sql', 'args'}
+        :param after: 执行后钩子 参数另含 {'seconds', 'rows', 'bytes', 'error'}
+        :return:
+        """
+        self.query_stats.add_hook(before=before, after=after)
+
+    def _stats_table(self, sql: str, table: str = '') -> str:
+        """
+        获取统计用表名
+        :param sql: 语句
+        :param table: 表参数
+        :return: 表名 多表以逗号分隔 无法识别时为空
+        """
+        return ','.join(self._sql_table_list(sql=sql, table=table))
+
+    def _sql_table_list(self, sql: str, table: str = '') -> typing.List[str]:
+        """
+        获取语句涉及的表名 优先使用表参数 否则从写入语句识别
+        :param sql: 语句
+        :param table: 表参数
+        :return:
+        """
+        ret_name_list = self._table_name_list(table=table)
+        if not ret_name_list:
+            _match = self._write_table_re.match(sql)
+            ret_name_list = self._table_name_list(table=_match.group(1)) if _match else []
+        return ret_name_list
+
+    def cache_stats(self) -> typing.Dict:
+        """
+        结果缓存统计
+        :return: {'hit', 'miss', 'evict', 'num', 'bytes', 'single_flight': {'call', 'shared', 'running'}}
+        """
+        ret_dict = self.cache_dict.stats() if isinstance(self.cache_dict, LRUCache) else {'num': len(self.cache_dict)}
+        if self.single_flight is not None:
+            ret_dict['single_flight'] = self.single_flight.stats()
+        return ret_dict
+
     # @time_statistics
-    def _execute(self, sql: str, exe_type: str = 'select', print_sql: bool = False) -> typing.Any:
+    def _execute(self, sql: str, exe_type: str = 'select', print_sql: bool = False,
+                 ret_info: bool = False, table: str = '', args: typing.Optional[typing.Sequence] = None,
+                 cursor_str: str = '') -> typing.Any:
         """
         执行sql语句
+        :param sql: 要执行的语句
+        :param exe_type: 执行类型 insert delete update upsert select (其他类型如 ddl / stage 不计入数量统计)
+        :param print_sql: 是否打印语句
+        :param ret_info: 是否返回执行信息字典 {'results', 'rowcount', 'lastrowid', 'description', 'message'}
+        :param table: 涉及的表名 写入时用于缓存失效
+        :param args: 语句参数 由驱动转义 (语句中的%需写为%%)
+        :param cursor_str: 本次执行游标类型 默认使用实例游标
         :return:
         """
-        # 打印sql语句
-        if print_sql:
-            self._print_sql(sql=sql)
+        # 执行信息 用于统计及钩子
+        _info = {'kind': exe_type, 'table': self._stats_table(sql=sql, table=table), 'sql': sql, 'args': args}
+        self.query_stats.before(info=_info)
+        _info.update(seconds=0.0, rows=0, bytes=0, error=None)
+        _start = time.perf_counter()
         try:
-            # 执行查询语句
-            _results = self.cursor.execute(query=sql)
-            # 特定数量数据提交
-            if exe_type in ['insert', 'delete', 'update']:
-                # 判断条数是否大于0
-                if _results > 0:
-                    self.count_dict[exe_type] += _results
-                # 数量达道提交数量
-                if self.count_dict[exe_type] % self.commit_num == 0:
-                    self.conn.commit()
-                    print(f"数据提交，提交数量：{self.commit_num}")
+            with self._connection(cursor_str=cursor_str) as (_conn, _cursor):
+                # 打印sql语句
+                if print_sql:
+                    self._print_sql(sql=_cursor.mogrify(sql, args) if args is not None else sql)
+                _in_transaction = getattr(self._local, 'depth', 0) > 0
+                try:
+                    # 执行查询语句
+                    _results = _cursor.execute(query=sql, args=args)
+                    # 数量统计
+                    if exe_type in ['insert', 'delete', 'update', 'upsert'] and _results > 0:
+                        with self._lock:
+                            self.count_dict[exe_type] += _results
+                    if _in_transaction:
+                        # 事务中 退出事务时提交 提交后再次失效相关缓存
+                        if exe_type != 'select':
+                            self._local.rows += max(_results, 0)
+                            self._local.write_list.append((sql, exe_type, table))
+                    elif self.pool is not None:
+                        # 连接池模式 写入立即提交
+                        if exe_type != 'select':
+                            self._commit(conn=_conn, rows=max(_results, 0))
+                    else:
+                        # 单连接模式 分组提交 (查询时仅检查时间)
+                        self._group_commit(conn=_conn, rows=_results, size=self._sql_bytes(sql=sql, args=args),
+                                           is_write=exe_type != 'select')
+                except Exception as e:
+                    # 事务中由事务统一回滚
+                    if not _in_transaction:
+                        _conn.rollback()
+                        self._reset_pending()
+                        logger.warning(f"异常回滚数据")
+                    raise e
+                finally:
+                    # 写入语句 失效相关缓存
+                    if exe_type != 'select':
+                        self._invalidate(sql=sql, exe_type=exe_type, table=table)
+                # 返回数据
+                if exe_type in ['select']:
+                    ret_data = _cursor.fetchall()  # 获取执行结果
+                elif exe_type in ['insert']:
+                    ret_data = _cursor.lastrowid  # 新插入数据的id
+                else:
+                    ret_data = _results
+                _info['rows'] = len(ret_data) if exe_type == 'select' else max(_results, 0)
+                if exe_type == 'select':
+                    _info['bytes'] = LRUCache.sizeof(data=ret_data)
+                if ret_info:
+                    return {
+                        'results': ret_data,
+                        'rowcount': _results,
+                        'lastrowid': _cursor.lastrowid,
+                        'description': _cursor.description,
+                        'message': getattr(getattr(_cursor, '_result', None), 'message', None) or b'',  # 执行信息
+                    }
+                return ret_data
         except Exception as e:
-            self.conn.rollback()
-            print(f"异常回滚数据")
+            _info['error'] = e
             raise e
-        # 返回数据
-        if exe_type in ['select']:
-            return self.cursor.fetchall()  # 获取执行结果
-        elif exe_type in ['insert']:
-            return self.cursor.lastrowid  # 新插入数据的id
-        else:
-            return _results
+        finally:
+            _info['seconds'] = time.perf_counter() - _start
+            self.query_stats.after(info=_info)
+
+    @contextlib.contextmanager
+    def transaction(self) -> typing.Generator['MySqlDBClass', None, None]:
+        """
+        事务 上下文内的写入不自动提交 正常结束时提交 异常时回滚
+            单连接模式: 先提交已有的分组提交数据 事务期间持有实例锁 其他线程等待
+            连接池模式: 借出连接并绑定到当前线程 本线程内的执行均使用该连接
+            嵌套使用时并入最外层事务
+            事务中的查询不使用结果缓存 (不读取也不写入) 提交后失效事务写入的表的缓存
+            with db.transaction():
+                db.insert(...)
+                db.update(...)
+        :return: 实例本身
+        """
+        if getattr(self._local, 'depth', 0):
+            self._local.depth += 1
+            try:
+                yield self
+            finally:
+                self._local.depth -= 1
+            return
+        with contextlib.ExitStack() as _stack:
+            if self.pool is None:
+                _stack.enter_context(self._lock)
+                self.flush()
+                _conn = self.conn
+            else:
+                _conn = _stack.enter_context(self.pool.connection())
+                self._local.conn = _conn
+            self._local.depth, self._local.rows, self._local.write_list = 1, 0, []
+            try:
+                yield self
+            except BaseException:
+                _conn.rollback()
+                # 回滚前其他线程可能已缓存事务写入的表
+                self._add_generation(tags=[''])
+                self.cache_dict.clear()
+                logger.warning(f"事务异常回滚")
+                raise
+            else:
+                self._commit(conn=_conn, rows=self._local.rows)
+                # 写入时已失效 提交前其他线程读取的旧数据可能已缓存 提交后再次失效
+                for _sql, _exe_type, _table in self._local.write_list:
+                    self._invalidate(sql=_sql, exe_type=_exe_type, table=_table)
+            finally:
+                self._local.conn, self._local.depth, self._local.rows, self._local.write_list = None, 0, 0, []
+
+    def flush(self) -> None:
+        """
+        提交单连接模式下分组提交未提交的写入
+        :return:
+        """
+        if self.pool is not None or not hasattr(self, 'conn'):
+            return
+        with self._lock:
+            if self.pending_dict['num'] and not getattr(self._local, 'depth', 0):
+                self._commit(conn=self.conn, rows=self.pending_dict['rows'])
+                self._reset_pending()
+
+    def commit_stats(self) -> typing.Dict:
+        """
+        提交统计
+        :return: {'commit', 'rows', 'seconds', 'max_seconds', 'last_seconds', 'avg_seconds', 'pending'}
+        """
+        with self._lock:
+            return {
+                **self.commit_dict,
+                'avg_seconds': self.commit_dict['seconds'] / self.commit_dict['commit']
+                if self.commit_dict['commit'] else 0.0,
+                'pending': dict(self.pending_dict),
+            }
+
+    def _group_commit(self, conn: pymysql.Connection, rows: int = 0, size: int = 0, is_write: bool = True) -> None:
+        """
+        分组提交 (单连接模式 需持有实例锁)
+            未提交的行数 / 字节数 / 时间 任一达到上限即提交
+        :param conn: 连接
+        :param rows: 本次写入影响行数
+        :param size: 本次写入语句字节数
+        :param is_write: 是否为写入 查询时仅检查时间
+        :return:
+        """
+        _pending = self.pending_dict
+        if is_write:
+            if not _pending['num']:
+                _pending['start'] = time.monotonic()
+                if self.commit_seconds:
+                    self._start_commit_timer(seconds=self.commit_seconds)
+            _pending['num'] += 1
+            _pending['rows'] += max(rows, 0)
+            _pending['bytes'] += size
+        elif not _pending['num']:
+            return
+        if (self.commit_num and _pending['rows'] >= self.commit_num) or \
+                (self.commit_bytes and _pending['bytes'] >= self.commit_bytes) or \
+                (self.commit_seconds and time.monotonic() - _pending['start'] >= self.commit_seconds):
+            _seconds = self._commit(conn=conn, rows=_pending['rows'])
+            logger.debug(f"数据提交，提交数量：{_pending['rows']} 语句数：{_pending['num']} 耗时：{_seconds:.4f} 秒")
+            self._reset_pending()
+
+    def _start_commit_timer(self, seconds: float) -> None:
+        """
+        启动分组提交时间定时器 (需持有实例锁) 已运行时不重复启动
+        :param seconds: 等待时间 秒
+        :return:
+        """
+        if self._commit_timer is not None:
+            return
+        self._commit_timer = threading.Timer(seconds, self._timer_commit)
+        self._commit_timer.daemon = True
+        self._commit_timer.start()
+
+    def _timer_commit(self) -> None:
+        """
+        定时器回调 未提交写入超过 commit_seconds 时提交 (写入后空闲也不会长期持有事务及行锁)
+            期间已提交并有新的写入时 按新写入时间重新计时
+        :return:
+        """
+        with self._lock:
+            self._commit_timer = None
+            _pending = self.pending_dict
+            if not _pending['num'] or not hasattr(self, 'conn'):
+                return
+            _remain = self.commit_seconds - (time.monotonic() - _pending['start'])
+            if _remain > 0:
+                self._start_commit_timer(seconds=_remain)
+                return
+            try:
+                _seconds = self._commit(conn=self.conn, rows=_pending['rows'])
+            except Exception as e:
+                logger.warning(f"定时提交失败：{e}")
+                return
+            logger.debug(f"定时提交，提交数量：{_pending['rows']} 语句数：{_pending['num']} 耗时：{_seconds:.4f} 秒")
+            self._reset_pending()
+
+    def _commit(self, conn: pymysql.Connection, rows: int = 0) -> float:
+        """
+        提交并记录提交耗时
+        :param conn: 连接
+        :param rows: 提交行数
+        :return: 提交耗时 秒
+        """
+        _start = time.perf_counter()
+        conn.commit()
+        ret_seconds = time.perf_counter() - _start
+        self.query_stats.record(kind='commit', seconds=ret_seconds, rows=rows)
+        with self._lock:
+            self.commit_dict['commit'] += 1
+            self.commit_dict['rows'] += rows
+            self.commit_dict['seconds'] += ret_seconds
+            self.commit_dict['last_seconds'] = ret_seconds
+            self.commit_dict['max_seconds'] = max(self.commit_dict['max_seconds'], ret_seconds)
+        return ret_seconds
+
+    def _reset_pending(self) -> None:
+        """
+        清空未提交写入统计
+        :return:
+        """
+        self.pending_dict.update(num=0, rows=0, bytes=0, start=0.0)
+
+    @staticmethod
+    def _sql_bytes(sql: str, args: typing.Optional[typing.Sequence] = None) -> int:
+        """
+        估算语句字节数 参数按字符串长度 其他类型按8字节
+        :param sql: 语句
+        :param args: 语句参数
+        :return:
+        """
+        ret_size = len(sql)
+        for _arg in args or ():
+            ret_size += len(_arg) if isinstance(_arg, (str, bytes)) else 8
+        return ret_size
+
+    @contextlib.contextmanager
+    def _connection(self, cursor_str: str = '') -> typing.Generator[typing.Tuple[pymysql.Connection, typing.Any],
+                                                                    None, None]:
+        """
+        获取执行用的连接及游标
+            单连接模式: 实例连接及游标 加锁独占
+            连接池模式: 从连接池借出 使用完毕归还 归还时回滚结束读取的隐式事务 (本线程事务中使用事务绑定的连接)
+        :param cursor_str: 游标类型 默认使用实例游标 指定时创建该类型的临时游标
+        :return: (连接, 游标)
+        """
+        _cursor_class = self.cursor_dict[cursor_str] if cursor_str else None
+        if self.pool is None:
+            with self._lock:
+                if _cursor_class is None:
+                    yield self.conn, self.cursor
+                    return
+                _cursor = self.conn.cursor(_cursor_class)
+                try:
+                    yield self.conn, _cursor
+                finally:
+                    _cursor.close()
+            return
+        # 本线程事务中 使用事务绑定的连接
+        _transaction_conn = getattr(self._local, 'conn', None)
+        with contextlib.nullcontext(_transaction_conn) if _transaction_conn is not None \
+                else self.pool.connection() as _conn:
+            _cursor = _conn.cursor(_cursor_class)
+            try:
+                yield _conn, _cursor
+            finally:
+                _cursor.close()
 
     @staticmethod
     def _print_sql(sql: str) -> None:
         """
-        统一sql打印
+        统一sql打印 INFO 级别日志
         :param sql:
         :return:
         """
-        print(f"{sql}")
+        logger.info(f"{sql}")
 
     @staticmethod
     def _get_start_step(select_dict: typing.Dict) -> typing.Tuple[int, int]:
@@ -634,26 +2755,66 @@ class MySqlDBClass(object):
         _start = select_dict.get('start', 0)
         return _start, _step
 
+    @staticmethod
+    def _row_value(row: typing.Any, key: str, index: int = 0) -> typing.Any:
+        """
+        获取单行数据的字段值 兼容字典与元组游标
+        :param row: 单行数据
+        :param key: 字典游标字段名
+        :param index: 元组游标字段位置
+        :return:
+        """
+        return row[key] if isinstance(row, dict) else row[index]
+
+    @staticmethod
+    def _chunk(data: typing.Iterable, size: int) -> typing.Generator[typing.List, None, None]:
+        """
+        按数量切分迭代器
+        :param data: 源数据
+        :param size: 每块数量
+        :return:
+        """
+        _chunk_list = []
+        for _item in data:
+            _chunk_list.append(_item)
+            if len(_chunk_list) >= size:
+                yield _chunk_list
+                _chunk_list = []
+        if _chunk_list:
+            yield _chunk_list
+
     @staticmethod
     def _data_dict_cleaning(data_dict: typing.Dict) -> typing.Dict:
         """
-        清洗数据
-        :param data_dict: 要清洗数据
+        清洗数据 None 转为 ''
+        :param data_dict: 要清洗数据 字典 / 元组
         :return:
         """
-        # 数据备份
-        ret_data_dict = copy.deepcopy(data_dict)
-        # 遍历数据
-        for _key, _value in data_dict.items():
-            # 判断是否有效数据
-            if _value is None:
-                ret_data_dict[_key] = ''
-        return ret_data_dict
+        # 浅复制 结果可能来自缓存 不修改原数据 (值为标量 无需深复制)
+        if not isinstance(data_dict, dict):
+            return tuple('' if _value is None else _value for _value in data_dict)
+        return {_key: '' if _value is None else _value for _key, _value in data_dict.items()}
 
-    def __del__(self) -> None:
+    def close(self) -> None:
+        """
+        提交数据 释放连接 / 连接池
+        :return:
+        """
+        if getattr(self, 'pool', None) is not None:
+            self.pool.close()  # 关闭连接池
+            self.pool = None
+            logger.info(f"释放连接池")
+        if getattr(self, '_commit_timer', None) is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
         if hasattr(self, 'cursor'):
             self.cursor.close()  # 释放游标
         if hasattr(self, 'conn'):
-            self.conn.commit()  # 数据提交
+            self.flush()  # 数据提交
+            self.conn.commit()
             self.conn.close()  # 释放连接
-            print(f"数据提交 释放连接")
+            logger.info(f"数据提交 释放连接")
+            del self.cursor, self.conn
+
+    def __del__(self) -> None:
+        self.close()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import collections
+import contextlib
+import threading
+import time
+import typing
+
+
+class ConnectionPool(object):
+    """
+    线程安全连接池
+        借出时按空闲时长检测连接 (ping) 失效自动重连 归还时回滚未结束的事务
+        连接数达到上限时排队等待 超时抛出异常
+        超过最大空闲时间的连接 (保留最小连接数) 在借出/归还时回收
+    """
+
+    def __init__(self, creator: typing.Callable[[], typing.Any], min_num: int = 1, max_num: int = 10,
+                 timeout: float = 30, max_idle: float = 300, ping_interval: float = 10) -> None:
+        """
+        :param creator: 创建连接的方法
+        :param min_num: 最小连接数 创建时预先建立
+        :param max_num: 最大连接数
+        :param timeout: 排队等待连接的超时时间 秒
+        :param max_idle: 最大空闲时间 秒 超过后回收 (保留 min_num 个)
+        :param ping_interval: 空闲超过该时间的连接借出前先 ping 检测 秒 0为每次检测
+        """
+        if max_num < 1 or min_num < 0 or min_num > max_num:
+            raise Exception(f"连接池参数错误：min_num：{min_num} max_num：{max_num}")
+        self.creator = creator
+        self.min_num = min_num
+        self.max_num = max_num
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self._idle = collections.deque()  # 空闲连接 [(连接, 归还时间)]
+        self._num = 0  # 已创建连接数 (含借出)
+        self._closed = False
+        self._cond = threading.Condition()
+        self.count_dict = {
+            'create': 0,  # 创建次数
+            'reconnect': 0,  # 失效重连次数
+            'reap': 0,  # 空闲回收次数
+            'wait': 0,  # 排队等待次数
+            'timeout': 0,  # 等待超时次数
+        }
+        for _ in range(min_num):
+            self._idle.append((self._create(), time.monotonic()))
+            self._num += 1
+
+    def get(self, timeout: typing.Optional[float] = None) -> typing.Any:
+        """
+        借出连接
+        :param timeout: 排队等待超时时间 秒 默认使用连接池设置
+        :return:
+        """
+        _timeout = self.timeout if timeout is None else timeout
+        _deadline = time.monotonic() + _timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception(f"连接池已关闭")
+                self._reap()
+                if self._idle:
+                    _conn, _time = self._idle.pop()  # 优先使用最近归还的连接 其余连接可被回收
+                    break
+                if self._num < self.max_num:
+                    self._num += 1
+                    _conn, _time = None, 0
+                    break
+                _remain = _deadline - time.monotonic()
+                if _remain <= 0:
+                    self.count_dict['timeout'] += 1
+                    raise Exception(f"获取连接超时：{_timeout} 秒 最大连接数：{self.max_num}")
+                self.count_dict['wait'] += 1
+                self._cond.wait(_remain)
+        # 锁外创建或检测连接
+        try:
+            if _conn is None:
+                return self._create()
+            if time.monotonic() - _time >= self.ping_interval:
+                try:
+                    _conn.ping(reconnect=True)
+                except Exception:
+                    self._close(conn=_conn)
+                    with self._cond:
+                        self.count_dict['reconnect'] += 1
+                    return self._create()
+            return _conn
+        except Exception:
+            # 创建失败 释放名额
+            with self._cond:
+                self._num -= 1
+                self._cond.notify()
+            raise
+
+    def put(self, conn: typing.Any, close: bool = False) -> None:
+        """
+        归还连接
+            归还前回滚 结束连接上未结束的隐式事务 (释放一致性读快照及元数据锁 下次借出时读取最新数据)
+            回滚失败的连接关闭
+        :param conn: 连接
+        :param close: 是否关闭 (连接异常时)
+        :return:
+        """
+        if not close:
+            try:
+                conn.rollback()
+            except Exception:
+                close = True
+        with self._cond:
+            if close or self._closed:
+                self._num -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._reap()
+            self._cond.notify()
+        if conn is not None:
+            self._close(conn=conn)
+
+    @contextlib.contextmanager
+    def connection(self, timeout: typing.Optional[float] = None) -> typing.Generator:
+        """
+        借出连接 上下文结束自动归还 连接异常或非 Exception 退出 (KeyboardInterrupt 等) 时关闭连接
+        :param timeout: 排队等待超时时间 秒
+        :return:
+        """
+        _conn = self.get(timeout=timeout)
+        try:
+            yield _conn
+        except Exception:
+            self.put(conn=_conn, close=not getattr(_conn, 'open', True))
+            raise
+        except BaseException:
+            # 中断 / 退出 / 生成器关闭 连接状态未知 关闭并释放名额
+            self.put(conn=_conn, close=True)
+            raise
+        else:
+            self.put(conn=_conn)
+
+    def close(self) -> None:
+        """
+        关闭连接池 关闭全部空闲连接 借出中的连接归还时关闭
+        :return:
+        """
+        with self._cond:
+            self._closed = True
+            _idle_list = list(self._idle)
+            self._idle.clear()
+            self._num -= len(_idle_list)
+            self._cond.notify_all()
+        for _conn, _ in _idle_list:
+            self._close(conn=_conn)
+
+    def stats(self) -> typing.Dict:
+        """
+        连接池统计
+        :return: {'num', 'idle', 'create', 'reconnect', 'reap', 'wait', 'timeout'}
+        """
+        with self._cond:
+            return {
+                'num': self._num,
+                'idle': len(self._idle),
+                **self.count_dict,
+            }
+
+    def _reap(self) -> None:
+        """
+        回收超过最大空闲时间的连接 (需持有锁) 从最久未使用的开始
+        :return:
+        """
+        if not self.max_idle:
+            return
+        _now = time.monotonic()
+        while self._idle and self._num > self.min_num and _now - self._idle[0][1] > self.max_idle:
+            _conn, _ = self._idle.popleft()
+            self._num -= 1
+            self.count_dict['reap'] += 1
+            self._close(conn=_conn)
+
+    def _create(self) -> typing.Any:
+        """
+        创建连接
+        :return:
+        """
+        _conn = self.creator()
+        with self._cond:
+            self.count_dict['create'] += 1
+        return _conn
+
+    @staticmethod
+    def _close(conn: typing.Any) -> None:
+        """
+        关闭连接 忽略异常
+        :param conn: 连接
+        :return:
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
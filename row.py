@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import collections.abc
+import typing
+
+
+class Row(collections.abc.Mapping):
+    """
+    紧凑行
+        仅保存驱动返回的值元组 字段名索引 {字段名: 位置} 由同一结果集的所有行共用
+        按字典方式读取 row['name'] / row.get / keys / items 读取时 None 转为 '' (与 select 字典行一致)
+        row[0] 按位置读取 row.raw 为原始值元组 dict(row) 转为字典
+    """
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index: typing.Dict[str, int], values: typing.Sequence) -> None:
+        """
+        :param index: 字段名索引 见 make_index
+        :param values: 值元组
+        """
+        self._index = index
+        self._values = values
+
+    @staticmethod
+    def make_index(description: typing.Sequence) -> typing.Dict[str, int]:
+        """
+        按游标 description 生成字段名索引 重名字段保留第一个
+        :param description: 游标 description
+        :return: {字段名: 位置}
+        """
+        ret_index = {}
+        for _i, _column in enumerate(description):
+            ret_index.setdefault(_column[0], _i)
+        return ret_index
+
+    @property
+    def raw(self) -> typing.Sequence:
+        """
+        原始值元组 (None 未转换)
+        :return:
+        """
+        return self._values
+
+    def __getitem__(self, key: typing.Union[str, int]) -> typing.Any:
+        _value = self._values[key if isinstance(key, int) else self._index[key]]
+        return '' if _value is None else _value
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)})"
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import bisect
+import collections
+import logging
+import random
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+# 耗时直方图分桶上限 秒 (最后一桶为无穷大)
+_BUCKET_LIST = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
+
+
+class Histogram(object):
+    """
+    耗时直方图 固定分桶 按桶上限估算分位数
+    """
+
+    __slots__ = ('count_list', 'num', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.count_list = [0] * len(_BUCKET_LIST)  # 各桶次数
+        self.num = 0  # 总次数
+        self.total = 0.0  # 总耗时
+        self.max = 0.0  # 最大耗时
+
+    def add(self, seconds: float) -> None:
+        """
+        记录一次耗时
+        :param seconds: 耗时 秒
+        :return:
+        """
+        self.count_list[bisect.bisect_left(_BUCKET_LIST, seconds)] += 1
+        self.num += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        估算分位数 返回所在桶的上限 (最后一桶返回最大值)
+        :param percent: 百分位 0~100
+        :return:
+        """
+        if not self.num:
+            return 0.0
+        _target = self.num * percent / 100
+        _count = 0
+        for _bound, _num in zip(_BUCKET_LIST, self.count_list):
+            _count += _num
+            if _count >= _target:
+                return min(_bound, self.max)
+        return self.max
+
+    def to_dict(self) -> typing.Dict:
+        """
+        直方图统计
+        :return: {'num', 'avg', 'max', 'p50', 'p90', 'p99', 'buckets': {桶上限: 次数}}
+        """
+        return {
+            'num': self.num,
+            'avg': self.total / self.num if self.num else 0.0,
+            'max': self.max,
+            'p50': self.percentile(percent=50),
+            'p90': self.percentile(percent=90),
+            'p99': self.percentile(percent=99),
+            'buckets': {_bound: _num for _bound, _num in zip(_BUCKET_LIST, self.count_list) if _num},
+        }
+
+
+class QueryStats(object):
+    """
+    语句执行统计
+        按语句类型 (select / insert / update / delete / upsert / load / ddl / commit) 及表名 记录耗时直方图
+        影响/返回行数 读取字节数 (近似值) 错误次数 缓存命中率
+        执行前后钩子 慢查询按比例采样保留最近若干条
+    """
+
+    def __init__(self, slow_seconds: float = 1.0, slow_num: int = 100, slow_sample: float = 1.0) -> None:
+        """
+        :param slow_seconds: 慢查询耗时阈值 秒 0为不记录
+        :param slow_num: 保留的慢查询条数
+        :param slow_sample: 慢查询采样比例 0~1
+        """
+        self.slow_seconds = slow_seconds
+        self.slow_sample = slow_sample
+        self.before_hook_list = []  # 执行前钩子 参数为执行信息字典
+        self.after_hook_list = []  # 执行后钩子 参数为执行信息字典
+        self._slow_list = collections.deque(maxlen=slow_num)  # 慢查询样本
+        self._kind_dict = {}  # {语句类型: 统计}
+        self._table_dict = {}  # {表名: 统计}
+        self._cache_dict = {'hit': 0, 'miss': 0}
+        self._lock = threading.Lock()
+
+    def add_hook(self, before: typing.Optional[typing.Callable[[typing.Dict], None]] = None,
+                 after: typing.Optional[typing.Callable[[typing.Dict], None]] = None) -> None:
+        """
+        添加钩子 钩子异常只记录日志 不影响执行
+        :param before: 执行前钩子 参数 {'kind', 'table', 'sql', 'args'}
+        :param after: 执行后钩子 参数另含 {'seconds', 'rows', 'bytes', 'error'}
+        :return:
+        """
+        if before is not None:
+            self.before_hook_list.append(before)
+        if after is not None:
+            self.after_hook_list.append(after)
+
+    def remove_hook(self, hook: typing.Callable[[typing.Dict], None]) -> None:
+        """
+        移除钩子
+        :param hook: 钩子方法
+        :return:
+        """
+        for _hook_list in (self.before_hook_list, self.after_hook_list):
+            if hook in _hook_list:
+                _hook_list.remove(hook)
+
+    def before(self, info: typing.Dict) -> None:
+        """
+        执行前调用
+        :param info: 执行信息字典
+        :return:
+        """
+        self._call_hook(hook_list=self.before_hook_list, info=info)
+
+    def after(self, info: typing.Dict) -> None:
+        """
+        执行后调用 记录统计 慢查询采样
+        :param info: 执行信息字典 {'kind', 'table', 'sql', 'args', 'seconds', 'rows', 'bytes', 'error'}
+        :return:
+        """
+        self.record(kind=info['kind'], table=info.get('table', ''), seconds=info['seconds'],
+                    rows=info.get('rows', 0), size=info.get('bytes', 0), error=info.get('error'))
+        if self.slow_seconds and info['seconds'] >= self.slow_seconds and \
+                (self.slow_sample >= 1 or random.random() < self.slow_sample):
+            _sample = {**info, 'time': time.time()}
+            with self._lock:
+                self._slow_list.append(_sample)
+            logger.warning(f"慢查询：{info['seconds']:.3f} 秒 类型：{info['kind']} 表：{info.get('table', '')} "
+                           f"语句：{str(info.get('sql', ''))[:500]}")
+        self._call_hook(hook_list=self.after_hook_list, info=info)
+
+    def record(self, kind: str, table: str = '', seconds: float = 0.0, rows: int = 0, size: int = 0,
+               error: typing.Optional[BaseException] = None) -> None:
+        """
+        记录一次执行
+        :param kind: 语句类型
+        :param table: 表名
+        :param seconds: 耗时 秒
+        :param rows: 返回/影响行数
+        :param size: 读取字节数
+        :param error: 异常
+        :return:
+        """
+        with self._lock:
+            for _dict, _key in ((self._kind_dict, kind), (self._table_dict, table)):
+                if _dict is self._table_dict and not table:
+                    continue
+                _item = _dict.get(_key)
+                if _item is None:
+                    _item = _dict[_key] = {'histogram': Histogram(), 'rows': 0, 'bytes': 0, 'error': 0}
+                _item['histogram'].add(seconds=seconds)
+                _item['rows'] += rows
+                _item['bytes'] += size
+                if error is not None:
+                    _item['error'] += 1
+
+    def record_cache(self, hit: bool) -> None:
+        """
+        记录一次缓存查询
+        :param hit: 是否命中
+        :return:
+        """
+        with self._lock:
+            self._cache_dict['hit' if hit else 'miss'] += 1
+
+    def stats(self) -> typing.Dict:
+        """
+        统计结果
+        :return: {'kind': {类型: 统计}, 'table': {表名: 统计}, 'cache': {'hit', 'miss', 'ratio'}, 'slow': [样本]}
+            统计: {'num', 'avg', 'max', 'p50', 'p90', 'p99', 'buckets', 'rows', 'bytes', 'error'}
+        """
+        with self._lock:
+            _hit, _miss = self._cache_dict['hit'], self._cache_dict['miss']
+            return {
+                'kind': {_k: self._item_dict(item=_v) for _k, _v in self._kind_dict.items()},
+                'table': {_k: self._item_dict(item=_v) for _k, _v in self._table_dict.items()},
+                'cache': {'hit': _hit, 'miss': _miss, 'ratio': _hit / (_hit + _miss) if _hit + _miss else 0.0},
+                'slow': list(self._slow_list),
+            }
+
+    def reset(self) -> None:
+        """
+        清空统计
+        :return:
+        """
+        with self._lock:
+            self._kind_dict.clear()
+            self._table_dict.clear()
+            self._slow_list.clear()
+            self._cache_dict.update(hit=0, miss=0)
+
+    @staticmethod
+    def _item_dict(item: typing.Dict) -> typing.Dict:
+        """
+        单项统计转字典
+        :param item: {'histogram', 'rows', 'bytes', 'error'}
+        :return:
+        """
+        return {**item['histogram'].to_dict(), 'rows': item['rows'], 'bytes': item['bytes'], 'error': item['error']}
+
+    @staticmethod
+    def _call_hook(hook_list: typing.List[typing.Callable], info: typing.Dict) -> None:
+        """
+        依次调用钩子 异常记录日志
+        :param hook_list: 钩子列表
+        :param info: 执行信息字典
+        :return:
+        """
+        for _hook in hook_list:
+            try:
+                _hook(info)
+            except Exception as e:
+                logger.exception(f"钩子执行异常：{_hook} {e}")
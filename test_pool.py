@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+连接池测试 使用 benchmark 的模拟连接 不连接数据库
+    运行: python -m pytest test_pool.py
+"""
+from .benchmark import BenchDBClass, make_rows
+from .pool import ConnectionPool
+
+
+def _watch_checkout(db: BenchDBClass) -> list:
+    """
+    记录每次借出时连接是否有未结束的事务
+    :param db: 连接池模式实例
+    :return: 借出记录列表 [是否有未结束的事务]
+    """
+    _get = db.pool.get
+    ret_list = []
+
+    def _watch_get(timeout=None):
+        _conn = _get(timeout=timeout)
+        ret_list.append(_conn.in_transaction)
+        return _conn
+
+    db.pool.get = _watch_get
+    return ret_list
+
+
+def test_put_rollback():
+    _db = BenchDBClass(rows=make_rows(10), pool_min=1, pool_max=1)
+    _conn = _db.pool.get()
+    _conn.cursor().execute('SELECT * FROM `bench`')
+    assert _conn.in_transaction
+    _db.pool.put(conn=_conn)
+    assert not _conn.in_transaction
+    assert _db.pool.stats()['idle'] == 1
+
+
+def test_put_rollback_failed_close():
+    class _BrokenConnection(object):
+        open = True
+
+        def rollback(self):
+            raise Exception('lost connection')
+
+        def close(self):
+            self.open = False
+
+    _pool = ConnectionPool(creator=_BrokenConnection, min_num=0, max_num=1)
+    _conn = _pool.get()
+    _pool.put(conn=_conn)
+    assert not _conn.open
+    assert (_pool.stats()['num'], _pool.stats()['idle']) == (0, 0)
+
+
+def test_checkout_without_open_transaction():
+    _db = BenchDBClass(rows=make_rows(10), pool_min=1, pool_max=2)
+    _checkout_list = _watch_checkout(db=_db)
+    for _i in range(3):
+        _db.select(select_dict={'table': 'bench', 'use_cache': False})
+        _db.insert(insert_dict={'table': 'bench', 'key_type_dict': {'name': str}, 'data_dict': {'name': f"n_{_i}"}})
+        with _db.transaction():
+            _db.select(select_dict={'table': 'bench', 'use_cache': False})
+    assert len(_checkout_list) >= 9
+    assert not any(_checkout_list)
+    assert not any(_conn.in_transaction for _conn, _ in _db.pool._idle)
+
+
+def test_transaction_base_exception_release():
+    _db = BenchDBClass(rows=make_rows(10), pool_min=0, pool_max=2, pool_timeout=0.1)
+    for _ in range(2):
+        try:
+            with _db.transaction():
+                _db.select(select_dict={'table': 'bench', 'use_cache': False})
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+
+    def _generator():
+        with _db.transaction():
+            yield _db.select(select_dict={'table': 'bench', 'use_cache': False})
+
+    for _ in range(2):
+        _iterator = _generator()
+        next(_iterator)
+        _iterator.close()  # GeneratorExit
+    assert (_db.pool.stats()['num'], _db.pool.stats()['idle']) == (0, 0)
+    with _db.transaction():
+        assert _db.select(select_dict={'table': 'bench', 'use_cache': False})